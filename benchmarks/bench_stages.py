@@ -0,0 +1,190 @@
+"""Stage benchmarks on synthetic plate images
+
+    python -m benchmarks.bench_stages --width 4000 --height 3000 --timepoints 8 --rois 6 --output bench.json
+    python -m benchmarks.bench_stages --compare bench.json --repeat 5
+
+Each stage reports wall time, peak traced memory and pixels/sec. A stage runs
+once as a warm-up, under tracemalloc for the peak memory, then --repeat
+more times untimed by tracing; the fastest run is the stage time (the median
+is kept too), so one noisy run does not read as a regression. Peak memory
+comes from tracemalloc, which sees numpy buffers but not OpenCV's internal
+allocations, so the process max RSS is recorded as well.
+"""
+import argparse
+import json
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from src.core.image_loader import ImageLoader
+from src.core.intensity_analyzer import IntensityAnalyzer
+from src.data.exporter import DataExporter
+from src.data.statistics import calculate_statistics
+from src.ui.roi_selector import ROISelector
+from src.visualization.plotter import Plotter
+
+#a stage slower than this ratio against the baseline is reported as a regression
+REGRESSION_RATIO = 1.2
+#timer noise floor: stages faster than this, or slower by less than MIN_DIFFERENCE, are never flagged
+MIN_SECONDS = 0.005
+MIN_DIFFERENCE = 0.001
+
+def make_plate(width, height, n_rois, seed=0):
+    """Synthetic plate photo with n_rois dark squares on a noisy background
+
+    Returns (image, rois); the first two ROIs are named sunscreen and control
+    so the default two-square layout is covered too.
+    """
+    rng = np.random.default_rng(seed)
+    image = rng.normal(170, 10, (height, width)).clip(0, 255).astype(np.uint8)
+
+    columns = int(np.ceil(np.sqrt(n_rois)))
+    rows = int(np.ceil(n_rois / columns))
+    cell_w = width // columns
+    cell_h = height // rows
+    side = int(min(cell_w, cell_h) * 0.6)
+
+    rois = {}
+    for i in range(n_rois):
+        x = (i % columns) * cell_w + (cell_w - side) // 2
+        y = (i // columns) * cell_h + (cell_h - side) // 2
+        level = 20 + 5 * i
+        image[y:y+side, x:x+side] = rng.normal(level, 4, (side, side)).clip(0, 255).astype(np.uint8)
+        name = ['sunscreen', 'control'][i] if i < 2 else f'patch_{i}'
+        rois[name] = (x, y, side, side)
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR), rois
+
+
+def write_series(directory, width, height, n_timepoints, n_rois):
+    """Write one JPEG per timepoint; returns (paths, timepoints, rois)"""
+    paths = []
+    rois = None
+    for t in range(n_timepoints):
+        image, rois = make_plate(width, height, n_rois, seed=t)
+        path = Path(directory) / f"{2 * t}hours.JPG"
+        cv2.imwrite(str(path), image)
+        paths.append(str(path))
+    return paths, [2 * t for t in range(n_timepoints)], rois
+
+
+def measure(name, pixels, function, *args, repeat=1, **kwargs):
+    """Run one stage (a traced warm-up, then repeat timed runs) and return (result, report)"""
+    tracemalloc.start()
+    result = function(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    elapsed = min(times)
+
+    report = {
+        'seconds': elapsed,
+        'median_seconds': statistics.median(times),
+        'runs': repeat,
+        'peak_traced_mb': peak / 1024 ** 2,
+        'pixels': int(pixels),
+        'pixels_per_second': pixels / elapsed if elapsed > 0 else None
+    }
+    print(f"{name:<12} {elapsed * 1000:9.1f} ms  {report['median_seconds'] * 1000:9.1f} ms  "
+          f"{report['peak_traced_mb']:8.1f} MB  {(report['pixels_per_second'] or 0) / 1e6:9.1f} Mpx/s")
+    return result, report
+
+
+def run(width, height, n_timepoints, n_rois, workdir, pixel_format='list', repeat=1):
+    paths, timepoints, rois = write_series(workdir, width, height, n_timepoints, n_rois)
+    roi_selector = ROISelector()
+    roi_selector.set_named_rois(rois)
+    frame_pixels = width * height * n_timepoints
+    roi_pixels = sum(w * h for x, y, w, h in rois.values()) * n_timepoints
+
+    stages = {}
+    print(f"{'stage':<12} {'min':>12} {'median':>12} {'peak':>11} {'throughput':>15}")
+    images, stages['load'] = measure('load', frame_pixels, ImageLoader().load_images, paths, repeat=repeat)
+    analyzer = IntensityAnalyzer(roi_selector)
+    results, stages['extract'] = measure('extract', roi_pixels, analyzer.analyze_all_timepoints, images, timepoints,
+                                         repeat=repeat)
+    del images
+
+    all_pixels = [results[t][name]['intensities'] for t in timepoints for name in rois]
+    _, stages['statistics'] = measure('statistics', roi_pixels,
+                                      lambda: [calculate_statistics(pixels) for pixels in all_pixels], repeat=repeat)
+    del all_pixels
+
+    _, stages['csv'] = measure('csv', roi_pixels, DataExporter.save_to_csv, results, Path(workdir) / 'bench.csv',
+                               repeat=repeat)
+    _, stages['json'] = measure('json', roi_pixels, DataExporter.save_to_json, results, Path(workdir) / 'bench.json',
+                                pixel_format=pixel_format, repeat=repeat)
+    _, stages['plot'] = measure('plot', roi_pixels, Plotter.plot_intensity_distributions,
+                                results, Path(workdir) / 'bench.png', repeat=repeat)
+    return stages
+
+
+def compare(baseline, current):
+    """Print per-stage ratios of the fastest runs; returns True when any stage regressed"""
+    regressed = False
+    print(f"\n{'stage':<12} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, report in current['stages'].items():
+        before = baseline['stages'].get(name)
+        if before is None:
+            continue
+        ratio = report['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+        noise = (max(before['seconds'], report['seconds']) < MIN_SECONDS
+                 or report['seconds'] - before['seconds'] < MIN_DIFFERENCE)
+        flag = '  REGRESSION' if ratio > REGRESSION_RATIO and not noise else ''
+        regressed = regressed or bool(flag)
+        print(f"{name:<12} {before['seconds'] * 1000:8.1f}ms {report['seconds'] * 1000:8.1f}ms {ratio:7.2f}{flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each analysis stage on synthetic plates")
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--timepoints', type=int, default=4)
+    parser.add_argument('--rois', type=int, default=2)
+    parser.add_argument('--pixel-format', default='list', help="JSON pixel format (see exporter.PIXEL_FORMATS)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage after a warm-up (min is reported)")
+    parser.add_argument('--output', help="write the JSON report here")
+    parser.add_argument('--compare', help="baseline JSON report to diff against")
+    args = parser.parse_args(argv)
+
+    print(f"{args.width}x{args.height}, {args.timepoints} timepoints, {args.rois} ROIs")
+    with tempfile.TemporaryDirectory() as workdir:
+        stages = run(args.width, args.height, args.timepoints, args.rois, workdir, args.pixel_format, args.repeat)
+
+    report = {
+        'parameters': {'width': args.width, 'height': args.height,
+                       'timepoints': args.timepoints, 'rois': args.rois,
+                       'pixel_format': args.pixel_format, 'repeat': args.repeat},
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'opencv': cv2.__version__, 'machine': platform.machine()},
+        #ru_maxrss is KB on Linux, bytes on macOS
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024),
+        'stages': stages
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark report saved to: {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, report):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
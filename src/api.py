@@ -0,0 +1,136 @@
+"""In-process analysis API
+
+    from src.api import AnalysisOptions, analyze
+    from src.data.cache import ResultCache
+
+    results = analyze({0: 'images/0hours.JPG', 2: 'images/2hours.JPG'},
+                      {'sunscreen': (x, y, w, h), 'control': (x, y, w, h)},
+                      AnalysisOptions(cache=ResultCache()))
+    results.stat('mean')                    # (timepoints, ROIs) array
+    results.stats(2, 'sunscreen')['median']
+
+Results hold per-ROI 256-bin histograms instead of raw pixel lists, so a
+result is a few KB whatever the image size. Per-timepoint entries that are
+not ROIs - 'comparison', 'alignment', 'illumination' - are kept in
+Results.extras, and the error bounds of approximate runs in Results.errors.
+Results.to_dict() gives the {time: {roi: {'histogram', 'stats'}}} layout
+that DataExporter and Plotter take, extras and error bounds included.
+"""
+import numpy as np
+from pathlib import Path
+from src.core.batch import parse_timepoint
+from src.core.options import AnalysisOptions
+from src.core.pipeline import stream_analysis
+from src.core.roi_utils import roi_names
+from src.data.statistics import N_BINS, STAT_NAMES, averaged_statistics, statistics_from_histogram
+from src.ui.roi_selector import ROISelector
+
+
+def _extras(result):
+    """The non-ROI entries of one timepoint's result"""
+    names = set(roi_names(result))
+    return {name: value for name, value in result.items() if name not in names}
+
+
+def _errors(results):
+    """{time: {roi: errors}} of the ROIs that carry error bounds"""
+    errors = {}
+    for time, result in results.items():
+        bounds = {name: result[name]['errors'] for name in roi_names(result) if 'errors' in result[name]}
+        if bounds:
+            errors[time] = bounds
+    return errors
+
+
+class Results:
+    """Histograms and stats of one series: timepoints x ROIs"""
+    __slots__ = ('timepoints', 'roi_names', 'histograms', 'table', 'extras', 'errors')
+
+    def __init__(self, timepoints, roi_names, histograms, extras=None, errors=None):
+        self.timepoints = list(timepoints)
+        self.roi_names = list(roi_names)
+        #(timepoints, ROIs, 256) pixel counts
+        self.histograms = np.asarray(histograms, dtype=np.int64).reshape(len(self.timepoints),
+                                                                         len(self.roi_names), N_BINS)
+        #{time: {name: entry}} - bootstrap comparison, alignment offset, illumination gain
+        self.extras = extras or {}
+        #{time: {roi: 95% error bounds}} of approximate (reduced or strided) runs
+        self.errors = errors or {}
+        #(timepoints, ROIs, len(STAT_NAMES)), columns in STAT_NAMES order
+        self.table = np.array([[[stats[name] for name in STAT_NAMES]
+                                for stats in (self.stats(time, roi) for roi in self.roi_names)]
+                               for time in self.timepoints], dtype=float)
+
+    @classmethod
+    def from_dict(cls, results):
+        """Build from a {time: {roi: {'histogram', ...}}} results dict"""
+        times = sorted(results)
+        names = roi_names(results[times[0]]) if times else []
+        histograms = [[results[time][name]['histogram'] for name in names] for time in times]
+        extras = {time: _extras(results[time]) for time in times}
+        return cls(times, names, np.reshape(histograms, (len(times), len(names), N_BINS)), extras,
+                   _errors(results))
+
+    def _index(self, time, roi):
+        return self.timepoints.index(time), self.roi_names.index(roi)
+
+    def stat(self, name):
+        """One statistic for every (timepoint, ROI) as a 2D array"""
+        return self.table[:, :, STAT_NAMES.index(name)]
+
+    def stats(self, time, roi):
+        """Stats dict of one ROI at one timepoint (NaN but the mean for block-averaged runs)"""
+        return averaged_statistics(statistics_from_histogram(self.histogram(time, roi)),
+                                   self.errors.get(time, {}).get(roi))
+
+    def histogram(self, time, roi):
+        t, r = self._index(time, roi)
+        return self.histograms[t, r]
+
+    def to_dict(self):
+        """{time: {roi: {'histogram', 'stats'[, 'errors']}, extra: entry}} for DataExporter and Plotter"""
+        results = {}
+        for t, time in enumerate(self.timepoints):
+            results[time] = {roi: {'histogram': self.histograms[t, r], 'stats': self.stats(time, roi)}
+                             for r, roi in enumerate(self.roi_names)}
+            for roi, errors in self.errors.get(time, {}).items():
+                results[time][roi]['errors'] = errors
+            results[time].update(self.extras.get(time, {}))
+        return results
+
+    def __len__(self):
+        return len(self.timepoints)
+
+    def __repr__(self):
+        return f"Results(timepoints={self.timepoints}, rois={self.roi_names})"
+
+
+def analyze(series, rois, options=None):
+    """Analyze an image series in-process and return a Results
+
+    series is {timepoint: path}, or a list of paths whose file names carry the
+    timepoint ('2hours.JPG'). rois maps name -> (x, y, w, h) in full-resolution
+    pixels. options is an AnalysisOptions or a dict of its fields; raw pixels
+    are never kept.
+    """
+    options = AnalysisOptions.of(options).replace(keep_intensities=False)
+    if not isinstance(series, dict):
+        series = {parse_timepoint(path): path for path in series}
+    times = sorted(series)
+    missing = [str(series[time]) for time in times if not Path(series[time]).exists()]
+    if missing:
+        raise FileNotFoundError(f"Could not load image: {', '.join(missing)}")
+
+    roi_selector = ROISelector()
+    roi_selector.set_named_rois(rois)
+    names = list(roi_selector.rois)
+    histograms = np.empty((len(times), len(names), N_BINS), dtype=np.int64)
+    extras = {}
+    errors = {}
+    stream = stream_analysis([series[time] for time in times], times, roi_selector, options)
+    for t, (time, result) in enumerate(stream):
+        for r, name in enumerate(names):
+            histograms[t, r] = result[name]['histogram']
+        extras[time] = _extras(result)
+        errors.update(_errors({time: result}))
+    return Results(times, names, histograms, extras, errors)
@@ -0,0 +1,415 @@
+"""Command line interface
+
+    python main.py analyze            # configured series -> CSV, JSON, histograms
+    python main.py export --csv out.csv
+    python main.py plot --preview
+    python main.py batch plates/
+    python main.py watch              # analyze new images as they land
+    python main.py trends --batch outputs/reports/batch_results.json
+
+Only argparse/json/pathlib are imported up front. cv2, numpy and matplotlib
+are imported inside the commands that need them, so --help and light
+commands start instantly.
+"""
+import argparse
+import sys
+from pathlib import Path
+from src.core.config import DEFAULT_CONFIG_FILE, image_series, load_config, output_paths
+
+COMMANDS = ('analyze', 'export', 'plot', 'batch', 'watch', 'trends')
+#analyze flags that change what ends up in the reports
+ANALYSIS_OPTIONS = ('pixel_format', 'tile_rows', 'reduce', 'sample_step', 'align', 'normalize', 'bootstrap')
+#same as src.data.exporter.PIXEL_FORMATS - repeated so --help does not import numpy
+PIXEL_FORMATS = ('list', 'base64', 'npy', 'none')
+#options that go before the command -> whether they take a value
+GLOBAL_OPTIONS = {'--config': True, '--metrics': True, '--profile': True, '--trace-memory': False}
+
+def _parse_roi(text):
+    """'x,y,w,h' -> (x, y, w, h)"""
+    return tuple(int(v) for v in text.split(','))
+
+
+def _make_cache(config):
+    from src.data.cache import ResultCache
+    cache_settings = config.get('cache', {})
+    return ResultCache(cache_settings.get('directory', 'outputs/cache/results'),
+                       cache_settings.get('max_megabytes', 512) * 1024 * 1024)
+
+
+def _make_detector(config):
+    roi_settings = config.get('roi_settings', {})
+    if not roi_settings.get('auto_detect'):
+        return None
+    from src.core.roi_detector import ROIDetector
+    return ROIDetector(cache_file=roi_settings.get('detection_cache', 'outputs/cache/roi_detections.json'))
+
+
+def _resolve_rois(roi_selector, config, reference_path, detector=None):
+    """Saved/configured ROIs first, then automatic detection, then manual selection (saved for next time)"""
+    roi_settings = config.get('roi_settings', {})
+    roi_file = roi_settings.get('roi_file', 'outputs/rois.json')
+    display_scale = roi_settings.get('display_scale', 0.3)
+
+    if roi_selector.has_rois() or roi_selector.load_saved_rois(config, roi_file):
+        return
+    if detector is not None:
+        try:
+            roi_selector.detect_rois(reference_path, detector, display_scale)
+            return
+        except ValueError as e:
+            print(f"Automatic ROI detection failed ({e}) - falling back to manual selection")
+
+    from src.core.image_loader import ImageLoader
+    #pick ROIs on a reduced preview, then only keep the ROI area of each frame
+    preview, preview_scale = ImageLoader().load_preview(reference_path, display_scale)
+    roi_selector.set_rois(preview, preview_scale, display_scale, roi_file=roi_file)
+
+
+def _make_illumination(args, config):
+    """(FlatField or None, ControlNormalizer or None) from --normalize/--blank and the illumination config"""
+    settings = config.get('illumination', {})
+    mode = args.normalize or settings.get('mode')
+    blank = args.blank or settings.get('blank_image')
+    if mode is None:
+        return None, None
+    from src.core.illumination import ControlNormalizer, FlatField
+    if mode == 'control':
+        return None, ControlNormalizer(settings.get('control_roi', 'control'), settings.get('reference_level'))
+    if blank is None:
+        raise SystemExit("Flat-field normalisation needs a blank reference shot (--blank or illumination.blank_image)")
+    return FlatField(blank, cache_dir=settings.get('cache_dir', 'outputs/cache/flatfield')), None
+
+
+def _with_default_command(argv):
+    """argv with 'analyze' inserted after the global options, e.g. --config c.json --no-plot"""
+    i = 0
+    while i < len(argv) and argv[i].split('=', 1)[0] in GLOBAL_OPTIONS:
+        takes_value = GLOBAL_OPTIONS[argv[i].split('=', 1)[0]] and '=' not in argv[i]
+        i += 2 if takes_value else 1
+    return argv[:i] + ['analyze'] + argv[i:]
+
+
+def cmd_analyze(args, config):
+    from src.core.options import AnalysisOptions
+    from src.core.pipeline import run_streaming
+    from src.core.roi_utils import roi_names
+    from src.data.exporter import DataExporter, StreamingExporter
+    from src.ui.roi_selector import ROISelector
+
+    image_paths, timepoints = image_series(config)
+    outputs = output_paths(config)
+    #make sure images are there before anything heavy happens
+    missing = [path for path in image_paths if not Path(path).exists()]
+    if missing:
+        print(f"Missing: {', '.join(missing)}")
+        return 1
+    if args.tile_rows and (args.reduce > 1 or args.sample_step > 1):
+        raise SystemExit("--tile-rows has no approximate mode - drop --reduce/--sample-step")
+    if args.store and (args.reduce > 1 or args.sample_step > 1):
+        raise SystemExit("--store only takes exact results - drop --reduce/--sample-step")
+    if args.reduce > 1 or args.sample_step > 1:
+        #approximate stats never replace the exact reports
+        outputs = {key: path if key == 'manifest' else path.with_name(f"preview_{path.name}")
+                   for key, path in outputs.items()}
+        print(f"Approximate run - reports go to {outputs['csv'].parent}/preview_*")
+    for path in outputs.values():
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    roi_selector = ROISelector()
+    _resolve_rois(roi_selector, config, image_paths[0], _make_detector(config))
+    cache = None if args.no_cache else _make_cache(config)
+    aligner = None
+    alignment = config.get('alignment', {})
+    if args.align or alignment.get('enabled'):
+        from src.core.registration import FrameAligner
+        #every timepoint is registered against the first one
+        aligner = FrameAligner(image_paths[0], alignment.get('reduction', 4),
+                               alignment.get('cache_file', 'outputs/cache/alignments.json'))
+
+    flat_field, normalizer = _make_illumination(args, config)
+
+    #the streamed reports are fingerprinted by what goes in - images, ROIs, config and analysis options
+    from src.data.cache import ANALYSIS_VERSION
+    from src.data.manifest import RunManifest, fingerprint
+    manifest = RunManifest(outputs['manifest'], force=args.force)
+    options = {name: getattr(args, name) for name in ANALYSIS_OPTIONS}
+    options['blank'] = flat_field.digest if flat_field is not None else None
+    manifest.record(rois=roi_selector.rois, config=config, options=options)
+    run_inputs = fingerprint(manifest.record_inputs(image_paths), roi_selector.rois, config, options,
+                             ANALYSIS_VERSION)
+    csv_file = None if manifest.skip(outputs['csv'], fingerprint('csv', run_inputs)) else outputs['csv']
+    json_file = None if manifest.skip(outputs['json'], fingerprint('json', run_inputs)) else outputs['json']
+
+    comparison = None
+    if args.bootstrap:
+        from src.data.bootstrap import BootstrapComparison
+        #fixed seed keeps reports reproducible, so the manifest can recognise them
+        comparison = BootstrapComparison(resamples=args.bootstrap, workers=args.bootstrap_workers, seed=0)
+
+    analysis = AnalysisOptions(cache=cache, prefetch=args.prefetch, tile_rows=args.tile_rows,
+                               keep_intensities=args.pixel_format != 'none',
+                               reduction=args.reduce, sample_step=args.sample_step, aligner=aligner,
+                               flat_field=flat_field, normalizer=normalizer, comparison=comparison)
+
+    #one timepoint at a time - rows are written as soon as each image is done
+    results = {}
+    with StreamingExporter(csv_file, json_file, pixel_format=args.pixel_format) as exporter:
+        for time, result in run_streaming(image_paths, timepoints, roi_selector, exporter, analysis):
+            print(f"Analyzed: {time} hours")
+            #pixels are already on disk - the plot only needs the histograms
+            for roi_type in roi_names(result):
+                result[roi_type].pop('intensities', None)
+            results[time] = result
+    if cache is not None:
+        print(f"Cache: {cache.hits} hits, {cache.misses} misses")
+    if comparison is not None:
+        comparison.close()
+        DataExporter.save_comparison_to_csv(results, outputs['comparison'], manifest)
+
+    if args.store:
+        from src.data.results_store import ResultsStore
+        sample = args.sample or Path(config.get('images', {}).get('directory', 'images/')).name
+        ResultsStore(args.store).append(results, sample)
+
+    DataExporter.print_statistics(results)
+    if not args.no_plot:
+        from src.visualization.plotter import Plotter
+        Plotter.plot_intensity_distributions(results, outputs['histograms'], preview=args.preview,
+                                             manifest=manifest)
+    manifest.save()
+    return 0
+
+
+def cmd_export(args, config):
+    from src.core.pipeline import export_all
+    from src.data.exporter import DataExporter
+    from src.data.manifest import RunManifest
+
+    outputs = output_paths(config)
+    input_file = args.input or outputs['json']
+    results = DataExporter.load_json(input_file)
+    manifest = RunManifest(outputs['manifest'], force=args.force)
+    manifest.record_inputs([input_file])
+    manifest.record(options={'pixel_format': args.pixel_format})
+    #CSV and JSON are written side by side
+    export_all(results, args.csv, args.json, pixel_format=args.pixel_format, manifest=manifest)
+    manifest.save()
+    if args.print or not (args.csv or args.json):
+        DataExporter.print_statistics(results)
+    return 0
+
+
+def cmd_plot(args, config):
+    from src.data.exporter import DataExporter
+    from src.data.manifest import RunManifest
+    from src.visualization.plotter import Plotter
+
+    outputs = output_paths(config)
+    input_file = args.input or outputs['json']
+    results = DataExporter.load_json(input_file)
+    manifest = RunManifest(outputs['manifest'], force=args.force)
+    manifest.record_inputs([input_file])
+    manifest.record(options={'preview': args.preview, 'dpi': args.dpi})
+    Plotter.plot_intensity_distributions(results, args.output or outputs['histograms'],
+                                         preview=args.preview, dpi=args.dpi, manifest=manifest)
+    manifest.save()
+    return 0
+
+
+def cmd_batch(args, config):
+    from src.core.batch import discover_samples, run_batch
+    from src.data.exporter import DataExporter
+    from src.ui.roi_selector import ROISelector
+
+    roi_settings = config.get('roi_settings', {})
+    roi_file_name = roi_settings.get('sample_roi_file', 'rois.json')
+    samples = discover_samples(args.root)
+    if not samples:
+        print(f"No timepoint images found under {args.root}")
+        return 1
+    print(f"Found {len(samples)} samples, {sum(len(p) for p in samples.values())} images")
+
+    roi_selector = ROISelector()
+    roi_selector.sunscreen_roi, roi_selector.control_roi = args.sunscreen_roi, args.control_roi
+    detector = _make_detector(config)
+    #saved/configured ROIs are the shared fallback, also for plates where detection fails
+    if not roi_selector.has_rois():
+        roi_selector.load_saved_rois(config, roi_settings.get('roi_file', 'outputs/rois.json'))
+    missing = [paths for paths in samples.values() if not (paths[0].parent / roi_file_name).exists()]
+    if missing and detector is None:
+        #plates without their own ROI file share one layout - resolve it once
+        _resolve_rois(roi_selector, config, missing[0][0])
+
+    cache = None if args.no_cache else _make_cache(config)
+    batch_results = run_batch(samples, roi_selector.rois, args.workers, roi_file_name, detector, cache)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    DataExporter.save_batch_to_csv(batch_results, output_dir / 'batch_results.csv')
+    DataExporter.save_batch_to_json(batch_results, output_dir / 'batch_results.json')
+    if args.store:
+        from src.data.results_store import ResultsStore
+        ResultsStore(args.store).append_batch(batch_results)
+    return 0
+
+
+def cmd_watch(args, config):
+    import time
+    from src.core.batch import IMAGE_SUFFIXES, TIMEPOINT_PATTERN, parse_timepoint
+    from src.core.watcher import ImageWatcher
+    from src.ui.roi_selector import ROISelector
+
+    directory = Path(args.directory or config.get('images', {}).get('directory', 'images/'))
+    outputs = output_paths(config)
+    for path in outputs.values():
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    roi_selector = ROISelector()
+    watcher = ImageWatcher(directory, roi_selector, outputs['csv'], outputs['json'],
+                           None if args.no_cache else _make_cache(config), args.interval)
+    #ROIs come from the saved layout, or from the first image once it exists
+    while not roi_selector.has_rois():
+        images = [p for p in directory.glob('*')
+                  if p.suffix.lower() in IMAGE_SUFFIXES and TIMEPOINT_PATTERN.search(p.stem)]
+        #the earliest timepoint, not the first name - '10hours' sorts before '2hours'
+        first = min(images, key=parse_timepoint) if images else None
+        if images or roi_selector.load_saved_rois(config, config.get('roi_settings', {}).get('roi_file')):
+            _resolve_rois(roi_selector, config, first, _make_detector(config))
+        else:
+            time.sleep(args.interval)
+
+    watcher.run(max_polls=args.polls)
+    return 0
+
+
+def cmd_trends(args, config):
+    import numpy as np
+    from src.data.exporter import DataExporter
+    from src.data.timeseries import analyze_series, stack_batch
+
+    if args.batch:
+        batch_results = DataExporter.load_batch_json(args.batch)
+    else:
+        input_file = Path(args.input or output_paths(config)['json'])
+        batch_results = {input_file.stem: DataExporter.load_json(input_file, mmap=False)}
+    #every sample goes through one array computation
+    samples, times, names, histograms = stack_batch(batch_results)
+    trends = analyze_series(times, names, histograms, args.target, args.reference)
+
+    for s, sample in enumerate(samples):
+        rates = ', '.join(f"{name} {rate:.4f}/h" for name, rate in zip(names, trends['decay_rate'][s]))
+        #samples missing the last timepoints report their latest ratio
+        ratios = trends['ratio'][s][~np.isnan(trends['ratio'][s])]
+        print(f"{sample}: decay {rates} - protection factor {trends['protection_factor'][s]:.2f} - "
+              f"final ratio {ratios[-1] if ratios.size else float('nan'):.3f}")
+    if args.output:
+        DataExporter.save_trends_to_csv(samples, trends, args.output)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='sunscreen-analysis', description="UV sunscreen intensity analysis")
+    parser.add_argument('--config', default=DEFAULT_CONFIG_FILE, help="analysis config (default: %(default)s)")
+    parser.add_argument('--metrics', help="write a JSON run report with per-stage timings and counters")
+    parser.add_argument('--trace-memory', action='store_true', help="add peak Python/numpy memory to --metrics")
+    parser.add_argument('--profile', help="write a cProfile dump of the run")
+    subparsers = parser.add_subparsers(dest='command')
+
+    analyze = subparsers.add_parser('analyze', help="analyze the configured image series")
+    analyze.add_argument('--pixel-format', choices=PIXEL_FORMATS, default='none',
+                         help="raw pixels in the JSON report (anything but none bypasses the result cache)")
+    analyze.add_argument('--no-plot', action='store_true', help="skip the histogram figure")
+    analyze.add_argument('--preview', action='store_true', help="fast low-DPI figure")
+    analyze.add_argument('--no-cache', action='store_true', help="recompute every image")
+    analyze.add_argument('--force', action='store_true', help="rewrite outputs even when the manifest says unchanged")
+    analyze.add_argument('--prefetch', type=int, default=2, help="images decoded ahead of the analysis (0 = off)")
+    analyze.add_argument('--tile-rows', type=int,
+                         help="memory-map .npy/TIFF scans and analyze them in strips of this many rows")
+    analyze.add_argument('--align', action='store_true',
+                         help="follow plate drift between timepoints (phase correlation against the first image)")
+    analyze.add_argument('--normalize', choices=('control', 'flatfield'),
+                         help="correct lighting: hold the control ROI level, or divide out a blank-shot field")
+    analyze.add_argument('--blank', help="blank reference shot for --normalize flatfield")
+    analyze.add_argument('--reduce', type=int, choices=(1, 2, 4, 8), default=1,
+                         help="quick QC: decode at 1/N scale, mean only (biased, no bound), into preview_* reports")
+    analyze.add_argument('--sample-step', type=int, default=1,
+                         help="quick QC: count every Nth row and column, stats ± bounds, into preview_* reports")
+    analyze.add_argument('--bootstrap', type=int, default=0, metavar='RESAMPLES',
+                         help="bootstrap CIs and p-values for sunscreen - control (e.g. 10000; 0 = off)")
+    analyze.add_argument('--bootstrap-workers', type=int,
+                         help="split the resamples across this many processes (default: one per CPU from 5000)")
+    analyze.add_argument('--store', help="also append the results to this SQLite results store")
+    analyze.add_argument('--sample', help="sample name in the results store (default: image directory name)")
+    analyze.set_defaults(handler=cmd_analyze)
+
+    export = subparsers.add_parser('export', help="re-export or print a saved JSON report")
+    export.add_argument('--input', help="JSON report (default: configured output)")
+    export.add_argument('--csv', help="write the stats CSV here")
+    export.add_argument('--json', help="rewrite the JSON report here")
+    export.add_argument('--pixel-format', choices=PIXEL_FORMATS, default='none', help="pixel format for --json")
+    export.add_argument('--print', action='store_true', help="print the statistics")
+    export.add_argument('--force', action='store_true', help="rewrite outputs even when the manifest says unchanged")
+    export.set_defaults(handler=cmd_export)
+
+    plot = subparsers.add_parser('plot', help="plot histograms from a saved JSON report")
+    plot.add_argument('--input', help="JSON report (default: configured output)")
+    plot.add_argument('--output', help="figure path (default: configured output)")
+    plot.add_argument('--preview', action='store_true', help="fast low-DPI figure")
+    plot.add_argument('--dpi', type=int)
+    plot.add_argument('--force', action='store_true', help="redraw even when the manifest says unchanged")
+    plot.set_defaults(handler=cmd_plot)
+
+    batch = subparsers.add_parser('batch', help="analyze every sample folder under a directory")
+    batch.add_argument('root', help="directory holding one folder of timepoint images per sample")
+    batch.add_argument('--sunscreen-roi', type=_parse_roi, help="x,y,w,h in full-resolution pixels")
+    batch.add_argument('--control-roi', type=_parse_roi, help="x,y,w,h in full-resolution pixels")
+    batch.add_argument('--workers', type=int, default=None)
+    batch.add_argument('--output-dir', default='outputs/reports')
+    batch.add_argument('--no-cache', action='store_true', help="recompute every image")
+    batch.add_argument('--store', help="also append the results to this SQLite results store")
+    batch.set_defaults(handler=cmd_batch)
+
+    watch = subparsers.add_parser('watch', help="analyze new timepoint images as they appear")
+    watch.add_argument('--directory', help="image directory (default: configured images directory)")
+    watch.add_argument('--interval', type=float, default=2.0, help="seconds between polls")
+    watch.add_argument('--polls', type=int, help="stop after this many polls")
+    watch.add_argument('--no-cache', action='store_true', help="recompute every image")
+    watch.set_defaults(handler=cmd_watch)
+
+    trends = subparsers.add_parser('trends', help="decay rates, ratios and distribution distances over time")
+    trends.add_argument('--input', help="JSON report (default: configured output)")
+    trends.add_argument('--batch', help="batch JSON report instead - all samples in one pass")
+    trends.add_argument('--target', default='sunscreen', help="ROI compared against the reference")
+    trends.add_argument('--reference', default='control')
+    trends.add_argument('--output', help="write the per-timepoint trends CSV here")
+    trends.set_defaults(handler=cmd_trends)
+    return parser
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    #plain `python main.py` keeps running the analysis as before
+    if not any(arg in COMMANDS or arg in ('-h', '--help') for arg in argv):
+        argv = _with_default_command(argv)
+    args = build_parser().parse_args(argv)
+    config = load_config(args.config)
+    if not (args.metrics or args.profile):
+        return args.handler(args, config)
+
+    from src.core.metrics import metrics
+    profiler = None
+    if args.metrics:
+        metrics.enable(trace_memory=args.trace_memory)
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        return args.handler(args, config)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profile saved to: {args.profile}")
+        if args.metrics:
+            metrics.save(args.metrics)
@@ -0,0 +1,93 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from src.core.options import AnalysisOptions
+from src.core.pipeline import stream_analysis
+from src.ui.roi_selector import ROISelector
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.tif', '.tiff')
+#'0hours.JPG', '2h.jpg', '1.5 hours.png' ...
+TIMEPOINT_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*h', re.IGNORECASE)
+
+def parse_timepoint(path):
+    """Timepoint in hours from an image file name like '2hours.JPG'"""
+    match = TIMEPOINT_PATTERN.search(Path(path).stem)
+    if match is None:
+        raise ValueError(f"No timepoint in file name: {path}")
+    value = float(match.group(1))
+    return int(value) if value.is_integer() else value
+
+
+def discover_samples(root):
+    """Map sample name -> image paths sorted by timepoint
+
+    Every directory under root (root itself included) holding timepoint
+    images is one sample, named by its path relative to root.
+    """
+    root = Path(root)
+    samples = {}
+    for directory in sorted([root] + [p for p in root.rglob('*') if p.is_dir()]):
+        images = [p for p in directory.iterdir()
+                  if p.suffix.lower() in IMAGE_SUFFIXES and TIMEPOINT_PATTERN.search(p.stem)]
+        if images:
+            name = directory.relative_to(root).as_posix() if directory != root else root.name
+            samples[name] = sorted(images, key=parse_timepoint)
+    return samples
+
+
+def _analyze_image(task):
+    """Worker: load + analyze one image (runs in a child process)"""
+    sample, path, rois, cache = task
+    roi_selector = ROISelector()
+    roi_selector.set_named_rois(rois)
+
+    #only histograms and stats go back to the parent - pickling pixels would dominate
+    options = AnalysisOptions(cache=cache, prefetch=0, keep_intensities=False)
+    time, result = next(stream_analysis([path], [parse_timepoint(path)], roi_selector, options))
+    return sample, time, result
+
+
+def sample_rois(paths, rois=None, roi_file_name='rois.json', detector=None):
+    """{name: roi} for one sample: its own ROI file, then automatic detection, then the shared ROIs"""
+    roi_file = Path(paths[0]).parent / roi_file_name
+    if roi_file.exists():
+        return ROISelector().load_rois(roi_file)
+    if detector is not None:
+        try:
+            sunscreen_roi, control_roi = detector.detect_file(paths[0])
+            return {'sunscreen': sunscreen_roi, 'control': control_roi}
+        except ValueError as e:
+            print(f"Automatic ROI detection failed for {roi_file.parent} ({e})")
+    if not rois:
+        raise ValueError(f"No ROIs for sample in {roi_file.parent} - add {roi_file_name} or pass shared ROIs")
+    return rois
+
+
+def run_batch(samples, rois=None, max_workers=None, roi_file_name='rois.json', detector=None, cache=None):
+    """Analyze every image of every sample across a process pool
+
+    samples is the mapping returned by discover_samples. A sample folder can
+    carry its own ROI file (roi_file_name); otherwise ROIs are detected
+    automatically when a detector is given, falling back to the shared
+    {name: roi} ROIs. Images are fanned out individually, so a few long
+    series still keep all cores busy. With a ResultCache, images seen before are skipped.
+    Samples without any ROIs are reported and left out.
+    Returns {sample: {time: result}}.
+    """
+    tasks = []
+    batch_results = {}
+    for sample, paths in samples.items():
+        try:
+            layout = sample_rois(paths, rois, roi_file_name, detector)
+        except ValueError as e:
+            print(f"Skipped {sample}: {e}")
+            continue
+        tasks.extend((sample, path, layout, cache) for path in paths)
+        batch_results[sample] = {}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for sample, time, result in executor.map(_analyze_image, tasks, chunksize=4):
+            batch_results[sample][time] = result
+            print(f"Analyzed: {sample} @ {time} hours")
+
+    return batch_results
@@ -0,0 +1,40 @@
+import json
+from pathlib import Path
+
+DEFAULT_CONFIG_FILE = 'analysis_config.json'
+
+def load_config(config_file=DEFAULT_CONFIG_FILE):
+    """Read analysis_config.json; a missing file gives an empty config"""
+    path = Path(config_file)
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def image_series(config):
+    """(image_paths, timepoints) of the configured series, ordered by timepoint"""
+    images = config.get('images', {})
+    directory = Path(images.get('directory', 'images/'))
+    files = images.get('files', [])
+    timepoints = images.get('timepoints_hours', [])
+    if len(files) != len(timepoints):
+        raise ValueError("images.files and images.timepoints_hours must have the same length")
+    pairs = sorted(zip(timepoints, files))
+    return [str(directory / name) for _, name in pairs], [time for time, _ in pairs]
+
+
+def output_paths(config):
+    """Paths of the csv/json/histograms/manifest/comparison outputs named in the config"""
+    output = config.get('output', {})
+    directories = output.get('directories', {})
+    files = output.get('files', {})
+    reports = Path(directories.get('reports', 'outputs/reports/'))
+    figures = Path(directories.get('figures', 'outputs/figures/'))
+    return {
+        'csv': reports / files.get('csv', 'uv_data.csv'),
+        'json': reports / files.get('json', 'analysis_results.json'),
+        'histograms': figures / files.get('histograms', 'histograms.png'),
+        'manifest': reports / files.get('manifest', 'manifest.json'),
+        'comparison': reports / files.get('comparison', 'comparison.csv')
+    }
@@ -0,0 +1,21 @@
+import functools
+import hashlib
+import os
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content, read in chunks
+
+    Remembered per (path, size, mtime) for the life of the process, so the
+    cache, aligner and manifest hashing the same image read it only once.
+    """
+    stat = os.stat(path)
+    return _file_digest(os.path.abspath(path), stat.st_size, stat.st_mtime_ns, chunk_size)
+
+
+@functools.lru_cache(maxsize=4096)
+def _file_digest(path, size, mtime_ns, chunk_size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
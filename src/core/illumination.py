@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+from pathlib import Path
+from src.core.hashing import file_digest
+from src.core.image_loader import ImageLoader
+from src.core.roi_utils import roi_names
+from src.data.statistics import LEVELS, N_BINS, averaged_statistics, statistics_from_histogram
+
+def gain_lut(gain):
+    """uint8 lookup table multiplying every intensity level by gain (saturating)"""
+    return np.clip(np.rint(LEVELS * gain), 0, N_BINS - 1).astype(np.uint8)
+
+
+def remap_histogram(histogram, lut):
+    """Histogram of cv2.LUT(pixels, lut) computed from the histogram of pixels alone"""
+    return np.bincount(lut, weights=histogram, minlength=N_BINS).astype(np.int64)
+
+
+class ControlNormalizer:
+    """Per-frame gain that holds the control ROI at a constant mean intensity
+
+    Lighting changes between photos move the whole frame, control included,
+    while UV only acts on the sunscreen. Every ROI of a frame is scaled by
+    reference_level / control mean, with reference_level taken from the
+    first frame unless given. The gain is a 256-entry LUT, so it is applied
+    to the histograms (O(256)) - cached results are normalised without
+    decoding anything - and to raw pixels only when those are kept.
+    """
+    def __init__(self, control='control', reference_level=None):
+        self.control = control
+        self.reference_level = reference_level
+
+    def normalize(self, result):
+        """Rescale one timepoint's result in place; adds an 'illumination' entry with the gain"""
+        control_mean = result[self.control]['stats']['mean']
+        if self.reference_level is None:
+            self.reference_level = control_mean
+        gain = self.reference_level / control_mean
+        lut = gain_lut(gain)
+
+        for name in roi_names(result):
+            roi_data = result[name]
+            roi_data['histogram'] = remap_histogram(roi_data['histogram'], lut)
+            roi_data['stats'] = averaged_statistics(statistics_from_histogram(roi_data['histogram']),
+                                                    roi_data.get('errors'))
+            if 'intensities' in roi_data:
+                roi_data['intensities'] = cv2.LUT(np.ascontiguousarray(roi_data['intensities']), lut)
+        result['illumination'] = {'mode': 'control', 'gain': gain}
+        return result
+
+
+class FlatField:
+    """Illumination field from a blank reference shot of the plate
+
+    The field is estimated once at low resolution (it is smooth by nature)
+    and cached as a small .npy keyed by the blank shot's content. apply()
+    corrects only the cropped region being analyzed: the matching part of
+    the gain map is resized to the crop and multiplied in with uint8
+    saturation, so no full-frame float image is ever made.
+    """
+    def __init__(self, blank_path, reduction=8, blur_fraction=0.05, cache_dir='outputs/cache/flatfield',
+                 image_loader=None):
+        self.blank_path = blank_path
+        self.reduction = reduction
+        self.digest = file_digest(blank_path)
+        cache_file = Path(cache_dir) / f"{self.digest}_{reduction}_{blur_fraction}.npy"
+        if cache_file.exists():
+            self.gain = np.load(cache_file)
+        else:
+            self.gain = self._estimate(image_loader or ImageLoader(), blur_fraction)
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            np.save(cache_file, self.gain)
+
+    def _estimate(self, image_loader, blur_fraction):
+        blank = image_loader.load_image(self.blank_path, grayscale=True, reduction=self.reduction)
+        #heavy blur keeps the lighting gradient and drops texture and noise
+        sigma = max(1.0, blur_fraction * max(blank.shape))
+        field = cv2.GaussianBlur(blank.astype(np.float32), (0, 0), sigma)
+        field = np.maximum(field, 1.0)
+        return (field.mean() / field).astype(np.float32)
+
+    def apply(self, gray, box):
+        """Flat-field corrected copy of gray, the crop at full-frame box (x, y, w, h)"""
+        x, y, w, h = (v / self.reduction for v in box)
+        height, width = self.gain.shape
+        x0, y0 = int(np.floor(x)), int(np.floor(y))
+        x1, y1 = min(width, int(np.ceil(x + w)) + 1), min(height, int(np.ceil(y + h)) + 1)
+        gain = cv2.resize(self.gain[y0:y1, x0:x1], gray.shape[1::-1], interpolation=cv2.INTER_LINEAR)
+        return cv2.multiply(gray, gain, dtype=cv2.CV_8U)
@@ -1,20 +1,89 @@
 import cv2
+import numpy as np
 from pathlib import Path
+from src.core.metrics import metrics
+from src.core.roi_utils import union_roi
+
+#libjpeg can decode straight to 1/2, 1/4 or 1/8 scale, which is far cheaper than resizing
+REDUCED_GRAYSCALE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
 
 class ImageLoader:
     def __init__(self):
         self.images = []
         self.image_paths = []
-    
-    def load_images(self,image_paths):
+        self.crop_origin = (0, 0)
+
+    def read_bytes(self, path):
+        """Read the encoded file - the I/O half of load_image"""
+        try:
+            with metrics.stage('read'):
+                buffer = np.fromfile(str(path), dtype=np.uint8)
+        except OSError:
+            raise FileNotFoundError(f"Could not load image: {path}")
+        metrics.count('bytes_read', buffer.size)
+        return buffer
+
+    def decode(self, buffer, grayscale=False, reduction=1, path='<buffer>'):
+        """Decode an encoded image buffer - the CPU half of load_image (releases the GIL)"""
+        if grayscale:
+            flag = REDUCED_GRAYSCALE_FLAGS[reduction]
+        elif reduction == 1:
+            flag = cv2.IMREAD_COLOR
+        else:
+            raise ValueError("Reduced decoding is only supported for grayscale images")
+
+        with metrics.stage('decode'):
+            img = cv2.imdecode(buffer, flag) if buffer.size else None
+        if img is None:
+            raise FileNotFoundError(f"Could not load image: {path}")
+        return img
+
+    def load_image(self, path, grayscale=False, reduction=1):
+        """Decode a single image, optionally straight to (reduced) grayscale"""
+        return self.decode(self.read_bytes(path), grayscale, reduction, path)
+
+    def load_preview(self, path, scale=0.3):
+        """Decode a downscaled grayscale image for the ROI picker
+
+        Returns (image, actual_scale); the decoder picks the strongest reduction
+        that still gives at least the requested display scale.
+        """
+        reduction = max(r for r in REDUCED_GRAYSCALE_FLAGS if 1 / r >= scale)
+        img = self.load_image(path, grayscale=True, reduction=reduction)
+        return img, 1 / reduction
+
+    def crop_to_rois(self, image, rois):
+        """Crop image to the union of the ROIs, dropping the rest of the frame"""
+        x, y, w, h = union_roi(rois)
+        #copy so the full frame can be freed
+        with metrics.stage('crop'):
+            return image[y:y+h, x:x+w].copy()
+
+    def load_images(self, image_paths, grayscale=False, rois=None):
+        """Load images, optionally decoding to grayscale and cropping to the ROIs
+
+        When rois are given every image is cropped to their union right after
+        decode and self.crop_origin holds the crop's top-left corner, which the
+        analyzer needs to translate the ROIs.
+        """
         self.image_paths = sorted(image_paths)
         self.images = []
+        self.crop_origin = (0, 0)
+        if rois is not None:
+            x, y, w, h = union_roi(rois)
+            self.crop_origin = (x, y)
         #make sure image exists - saves time later
         for path in self.image_paths:
-            img = cv2.imread(str(path))
-            if img is None:
-                raise FileNotFoundError(f"Could not load image: {path}")
+            img = self.load_image(path, grayscale=grayscale)
+            full_shape = img.shape
+            if rois is not None:
+                img = self.crop_to_rois(img, rois)
             self.images.append(img)
-            print(f"Loaded: {path} - Shape: {img.shape}")
-        
+            print(f"Loaded: {path} - Shape: {full_shape} - Kept: {img.shape}")
+
         return self.images
@@ -1,10 +1,35 @@
 import cv2
 import numpy as np
-from src.data.statistics import calculate_statistics
+from src.data.statistics import (N_BINS, averaged_statistics, calculate_histogram, sampling_errors,
+                                 statistics_from_histogram)
+from src.core.metrics import metrics
+from src.core.options import AnalysisOptions
+from src.core.roi_utils import offset_roi, scale_roi, union_roi
+
+#cv2.calcHist counts in float32, which is exact up to 2**24 pixels per bin
+CALCHIST_MAX_PIXELS = 1 << 24
+
+def roi_histogram(gray):
+    """256-bin histogram of a 2D uint8 view, counted without copying it"""
+    if gray.size >= CALCHIST_MAX_PIXELS:
+        return calculate_histogram(gray)
+    return cv2.calcHist([gray], [0], None, [N_BINS], [0, N_BINS]).ravel().astype(np.int64)
+
 
 class IntensityAnalyzer:
-    def __init__(self, roi_selector):
+    def __init__(self, roi_selector, options=None):
+        """options (AnalysisOptions or dict) - reduction/sample_step, flat_field, normalizer, comparison"""
         self.roi_selector = roi_selector
+        options = AnalysisOptions.of(options)
+        #raw pixels are only needed for pixel exports; histograms cover everything else
+        self.keep_intensities = options.keep_intensities
+        #images were decoded at 1/reduction scale; ROIs and origins stay in full-frame pixels
+        self.reduction = options.reduction
+        self.sample_step = options.sample_step
+        self.flat_field = options.flat_field
+        self.normalizer = options.normalizer
+        self.comparison = options.comparison
+        self.approximate = options.approximate
     
     def extract_roi_intensities(self, image, roi):
         """Extract intensity values from ROI"""
@@ -19,30 +44,84 @@ class IntensityAnalyzer:
         
         return gray.flatten()
     
-    def analyze_timepoint(self, image, time):
-        """Analyze single timepoint"""
-        sunscreen_intensities = self.extract_roi_intensities(image, self.roi_selector.sunscreen_roi)
-        control_intensities = self.extract_roi_intensities(image, self.roi_selector.control_roi)
+    def analyze_rois(self, image, rois, origin=(0, 0)):
+        """Analyze any number of named ROIs with a single grayscale conversion
+
+        The union of the ROIs is converted to grayscale once and every ROI's
+        histogram is counted straight from a view into it, so there are no
+        per-ROI crops, conversions or flatten() copies. rois maps
+        name -> (x, y, w, h) in full-frame coordinates; origin is the top-left
+        corner of image in the full frame when the loader cropped it.
+        Approximate runs add an 'errors' dict per ROI (see sampling_errors).
+        """
+        if self.reduction > 1:
+            rois = {name: scale_roi(roi, 1 / self.reduction) for name, roi in rois.items()}
+            origin = scale_roi((*origin, 0, 0), 1 / self.reduction)[:2]
+        local_rois = {name: offset_roi(roi, origin) for name, roi in rois.items()}
+        ux, uy, uw, uh = union_roi(local_rois.values())
+        
+        region = image[uy:uy+uh, ux:ux+uw]
+        with metrics.stage('grayscale'):
+            gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY) if len(region.shape) == 3 else region
+        if self.flat_field is not None:
+            #only the ROI union is corrected, in uint8
+            box = tuple(v * self.reduction for v in (ux + origin[0], uy + origin[1], uw, uh))
+            with metrics.stage('illumination'):
+                gray = self.flat_field.apply(gray, box)
         
-        return {
-            'sunscreen': {
-                'intensities': sunscreen_intensities,
-                'stats': calculate_statistics(sunscreen_intensities)
-            },
-            'control': {
-                'intensities': control_intensities,
-                'stats': calculate_statistics(control_intensities)
+        results = {}
+        for name, (x, y, w, h) in local_rois.items():
+            roi_gray = gray[y-uy:y-uy+h, x-ux:x-ux+w]
+            if self.sample_step > 1:
+                roi_gray = np.ascontiguousarray(roi_gray[::self.sample_step, ::self.sample_step])
+            with metrics.stage('histogram'):
+                histogram = roi_histogram(roi_gray)
+            with metrics.stage('stats'):
+                stats = statistics_from_histogram(histogram)
+            metrics.count('pixels_processed', roi_gray.size)
+            results[name] = {
+                'histogram': histogram,
+                'stats': stats
             }
-        }
+            if self.approximate:
+                fraction = roi_gray.size / (w * h) / self.reduction ** 2
+                results[name]['errors'] = sampling_errors(histogram, stats, fraction, averaged=self.reduction > 1)
+                #averaging narrows the distribution - only the mean survives a reduced decode
+                results[name]['stats'] = averaged_statistics(stats, results[name]['errors'])
+            if self.keep_intensities:
+                results[name]['intensities'] = roi_gray.flatten()
+        return results
+    
+    def analyze_timepoint(self, image, time, origin=(0, 0)):
+        """Analyze single timepoint
+
+        origin is the top-left corner of image in the full frame when the loader
+        cropped it to the ROIs (see ImageLoader.crop_origin).
+        """
+        return self.compare(self.normalize(self.analyze_rois(image, self.roi_selector.rois, origin)))
+    
+    def normalize(self, result):
+        """Apply the control normalisation, if any, to a finished timepoint result"""
+        if self.normalizer is None:
+            return result
+        with metrics.stage('illumination'):
+            return self.normalizer.normalize(result)
+    
+    def compare(self, result):
+        """Add the bootstrap comparison, if any, to a finished timepoint result"""
+        if self.comparison is not None:
+            with metrics.stage('bootstrap'):
+                result['comparison'] = self.comparison.compare(result)
+        return result
     
-    def analyze_all_timepoints(self, images, timepoints):
-        """Analyze both ROIs across all timepoints"""
-        if self.roi_selector.sunscreen_roi is None or self.roi_selector.control_roi is None:
+    def analyze_all_timepoints(self, images, timepoints, origin=(0, 0)):
+        """Analyze all ROIs across all timepoints"""
+        if not self.roi_selector.has_rois():
             raise ValueError("ROIs not set! Call set_rois() first")
         
         results = {}
         
         for i, (img, time) in enumerate(zip(images, timepoints)):
-            results[time] = self.analyze_timepoint(img, time)
+            results[time] = self.analyze_timepoint(img, time, origin)
             
         return results
@@ -0,0 +1,30 @@
+import json
+from pathlib import Path
+
+class JsonCache:
+    """A {key: entry} dict persisted as one JSON file, loaded on first use
+
+    cache_file=None keeps the entries in memory only.
+    """
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self._entries = None
+
+    def entries(self):
+        if self._entries is None:
+            self._entries = {}
+            if self.cache_file is not None and Path(self.cache_file).exists():
+                with open(self.cache_file) as f:
+                    self._entries = json.load(f)
+        return self._entries
+
+    def get(self, key):
+        return self.entries().get(key)
+
+    def put(self, key, entry):
+        self.entries()[key] = entry
+        if self.cache_file is None:
+            return
+        Path(self.cache_file).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_file, 'w') as f:
+            json.dump(self._entries, f, indent=2)
@@ -0,0 +1,93 @@
+import functools
+import json
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+class Metrics:
+    """Per-stage timers and counters for a run
+
+    Disabled by default, in which case stage() and count() cost next to
+    nothing. Stage times are summed over calls and threads, so with prefetch
+    threads the per-stage totals can exceed the wall time. Work done inside
+    batch worker processes is not collected.
+
+        with metrics.stage('decode'):
+            ...
+        metrics.count('bytes_read', len(buffer))
+    """
+    def __init__(self):
+        self.enabled = False
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._started = None
+
+    def enable(self, trace_memory=False):
+        """Start collecting; trace_memory also tracks the peak of Python/numpy allocations"""
+        self.enabled = True
+        self.stages = {}
+        self.counters = {}
+        self._started = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stage = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0})
+                stage['calls'] += 1
+                stage['seconds'] += elapsed
+
+    def timed(self, name):
+        """Decorator form of stage()"""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self):
+        """Structured run report"""
+        #ru_maxrss is KB on Linux, bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report = {
+            'wall_seconds': time.perf_counter() - self._started if self._started else None,
+            'peak_rss_mb': max_rss / (1024 ** 2 if sys.platform == 'darwin' else 1024),
+            'stages': {name: dict(stage) for name, stage in sorted(self.stages.items())},
+            'counters': dict(sorted(self.counters.items()))
+        }
+        if tracemalloc.is_tracing():
+            report['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        return report
+
+    def save(self, output_file):
+        """Write the run report as JSON"""
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+        with open(output_file, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        print(f"Run metrics saved to: {output_file}")
+
+
+#process-wide instance used by the loader, analyzer, exporter and plotter
+metrics = Metrics()
@@ -0,0 +1,59 @@
+class AnalysisOptions:
+    """How a series is analyzed, handed as one object from the API/CLI through the pipeline
+
+        grayscale           decode frames to grayscale
+        cache               data.cache.ResultCache, or None
+        prefetch            images decoded ahead on background threads (0 = inline)
+        tile_rows           analyze .npy/TIFF scans in strips of this many rows (core.tiled)
+        keep_intensities    keep raw ROI pixels in every result
+        reduction           decode at 1/reduction scale - approximate, mean only
+        sample_step         count every sample_step-th row and column - approximate
+        aligner             core.registration.FrameAligner
+        flat_field          core.illumination.FlatField
+        normalizer          core.illumination.ControlNormalizer
+        comparison          data.bootstrap.BootstrapComparison
+    """
+    DEFAULTS = {
+        'grayscale': True,
+        'cache': None,
+        'prefetch': 2,
+        'tile_rows': None,
+        'keep_intensities': True,
+        'reduction': 1,
+        'sample_step': 1,
+        'aligner': None,
+        'flat_field': None,
+        'normalizer': None,
+        'comparison': None,
+    }
+    __slots__ = tuple(DEFAULTS)
+
+    def __init__(self, **options):
+        unknown = set(options) - set(self.DEFAULTS)
+        if unknown:
+            raise TypeError(f"Unknown analysis options: {', '.join(sorted(unknown))}")
+        for name, default in self.DEFAULTS.items():
+            setattr(self, name, options.get(name, default))
+
+    @classmethod
+    def of(cls, options=None):
+        """AnalysisOptions from an AnalysisOptions, a {name: value} dict or None (defaults)"""
+        if isinstance(options, cls):
+            return options
+        return cls(**(options or {}))
+
+    def replace(self, **changes):
+        """Copy with some options changed"""
+        return AnalysisOptions(**{**self.to_dict(), **changes})
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.DEFAULTS}
+
+    @property
+    def approximate(self):
+        return self.reduction > 1 or self.sample_step > 1
+
+    def __repr__(self):
+        changed = ', '.join(f"{name}={getattr(self, name)!r}" for name, default in self.DEFAULTS.items()
+                            if getattr(self, name) != default)
+        return f"AnalysisOptions({changed})"
@@ -0,0 +1,148 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from src.core.image_loader import ImageLoader
+from src.core.intensity_analyzer import IntensityAnalyzer
+from src.core.options import AnalysisOptions
+from src.core.roi_utils import scale_roi, shift_rois, union_roi
+from src.core.tiled import TILED_SUFFIXES, analyze_large_image
+
+def prefetched(function, items, depth=2, workers=None):
+    """Yield function(item) for each item in order, running up to depth calls ahead
+
+    The calls run on a thread pool, so file reads and cv2 decoding (which
+    release the GIL) overlap with whatever the consumer does with the
+    previous result. depth bounds how many decoded frames can be waiting.
+    depth=0 runs everything inline.
+    """
+    if depth <= 0:
+        yield from map(function, items)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers or depth) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(function, item))
+            if len(pending) > depth:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def stream_analysis(image_paths, timepoints, roi_selector, options=None, image_loader=None):
+    """Load -> crop -> stats one timepoint at a time, yielding (time, result) like analyze_timepoint
+
+    Only the current frame (plus options.prefetch decoded ahead) is in memory.
+    Cached frames are not decoded, so the cache is only read when raw pixels are
+    not kept; approximate runs are never cached, and the cache keeps
+    flat-fielded but not control-normalised histograms.
+    """
+    options = AnalysisOptions.of(options)
+    image_loader = image_loader or ImageLoader()
+    analyzer = IntensityAnalyzer(roi_selector, options)
+    cache = None if options.approximate else options.cache
+    aligner, flat_field = options.aligner, options.flat_field
+    reduction, tile_rows = options.reduction, options.tile_rows
+    rois = roi_selector.rois
+    #what changes the cached histograms besides the image and ROIs
+    key_options = {'grayscale': options.grayscale}
+    if flat_field is not None:
+        key_options['flat_field'] = flat_field.digest
+
+    def lookup(key):
+        #cached results have no raw pixels - when those are wanted the cache is only written to
+        return None if options.keep_intensities else cache.get(key)
+
+    def tiled(path):
+        return tile_rows is not None and Path(path).suffix.lower() in TILED_SUFFIXES
+
+    if options.approximate and any(tiled(path) for path in image_paths):
+        raise ValueError("Strip-wise analysis has no approximate mode - drop reduction/sample_step or tile_rows")
+
+    def prepare(path):
+        """Alignment and cache lookup, then read + decode + crop or a strip-wise pass (runs on a prefetch thread)
+
+        Returns (key, result, cached, frame, offset); frame is (image, rois, origin)
+        when the analysis still has to run. Strip-wise scans are not aligned (offset None).
+        """
+        if tiled(path):
+            key = None if cache is None else cache.key(path, rois, key_options)
+            result = None if key is None else lookup(key)
+            if result is not None:
+                return key, result, True, None, None
+            return key, analyze_large_image(path, rois, tile_rows, flat_field=flat_field), False, None, None
+        #a frame aligned in an earlier run can be served from the cache without decoding
+        offset = (0, 0) if aligner is None else aligner.cached_offset(path)
+        key = None
+        if cache is not None and offset is not None:
+            key = cache.key(path, shift_rois(rois, offset), key_options)
+            result = lookup(key)
+            if result is not None:
+                return key, result, True, None, offset
+        image = image_loader.load_image(path, grayscale=options.grayscale or reduction > 1, reduction=reduction)
+        if offset is None:
+            offset = aligner.offset_for(image, path, 1 / reduction)
+            if cache is not None:
+                key = cache.key(path, shift_rois(rois, offset), key_options)
+                result = lookup(key)
+                if result is not None:
+                    return key, result, True, None, offset
+        frame_rois = shift_rois(rois, offset)
+        #the loader crops in decoded pixels, the analyzer takes full-frame coordinates
+        decoded_rois = [scale_roi(roi, 1 / reduction) for roi in frame_rois.values()]
+        origin = tuple(v * reduction for v in union_roi(decoded_rois)[:2])
+        return key, None, False, (image_loader.crop_to_rois(image, decoded_rois), frame_rois, origin), offset
+
+    prepared = prefetched(prepare, image_paths, options.prefetch)
+    for (key, result, cached, frame, offset), time in zip(prepared, timepoints):
+        if result is None:
+            result = analyzer.analyze_rois(*frame)
+        if cache is not None and not cached:
+            cache.put(key, result)
+        result = analyzer.compare(analyzer.normalize(result))
+        if aligner is not None and offset is not None:
+            result['alignment'] = {'dx': offset[0], 'dy': offset[1]}
+        yield time, result
+
+
+def run_streaming(image_paths, timepoints, roi_selector, exporter, options=None, image_loader=None):
+    """Run stream_analysis, handing every result to an open StreamingExporter
+
+    Writes happen on a single background thread (so rows stay in order)
+    while the next image is analyzed. Callers may modify the yielded result;
+    the writer works on its own copy of the per-ROI dicts.
+    """
+    with ThreadPoolExecutor(max_workers=1) as writer:
+        writes = deque()
+        for time, result in stream_analysis(image_paths, timepoints, roi_selector, options, image_loader):
+            snapshot = {name: dict(value) if isinstance(value, dict) else value for name, value in result.items()}
+            writes.append(writer.submit(exporter.write, time, snapshot))
+            #surface write errors early and keep at most a couple of results queued
+            while len(writes) > 2:
+                writes.popleft().result()
+            yield time, result
+        while writes:
+            writes.popleft().result()
+
+
+def export_all(results, csv_file=None, json_file=None, plot_file=None, pixel_format='none', preview=False,
+               manifest=None):
+    """Write the CSV, JSON and histogram figure of finished results concurrently
+
+    With a RunManifest, outputs whose results are unchanged are skipped.
+    """
+    from src.data.exporter import DataExporter
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = []
+        if csv_file is not None:
+            futures.append(executor.submit(DataExporter.save_to_csv, results, csv_file, manifest))
+        if json_file is not None:
+            futures.append(executor.submit(DataExporter.save_to_json, results, json_file, pixel_format,
+                                           manifest=manifest))
+        if plot_file is not None:
+            from src.visualization.plotter import Plotter
+            futures.append(executor.submit(Plotter.plot_intensity_distributions, results, plot_file, preview,
+                                           manifest=manifest))
+        for future in futures:
+            future.result()
@@ -0,0 +1,68 @@
+import threading
+import cv2
+import numpy as np
+from src.core.hashing import file_digest
+from src.core.image_loader import ImageLoader
+from src.core.json_cache import JsonCache
+
+class FrameAligner:
+    """Estimate how far each timepoint moved relative to the reference image
+
+    Translation is found by phase correlation between low-resolution
+    grayscale proxies (1/reduction scale), so alignment costs one small FFT
+    per frame. Offsets are in full-resolution pixels and cached by image
+    content, next to the result cache, so re-runs neither decode nor
+    correlate again. The reference itself is always at (0, 0).
+
+        aligner = FrameAligner(image_paths[0])
+        dx, dy = aligner.cached_offset(path) or aligner.offset_for(image, path)
+    """
+    def __init__(self, reference_path, reduction=4, cache_file='outputs/cache/alignments.json', image_loader=None):
+        self.reference_path = reference_path
+        self.reduction = reduction
+        self.cache_file = cache_file
+        self._cache = JsonCache(cache_file)
+        image_loader = image_loader or ImageLoader()
+        reference = image_loader.load_image(reference_path, grayscale=True, reduction=reduction)
+        self._reference = reference.astype(np.float32)
+        #the window suppresses the edge discontinuities the FFT would otherwise lock onto
+        self._window = cv2.createHanningWindow(reference.shape[::-1], cv2.CV_32F)
+        self._reference_digest = file_digest(reference_path)
+        self._lock = threading.Lock()
+
+    def _key(self, path):
+        return f"{self._reference_digest}:{file_digest(path)}:{self.reduction}"
+
+    def cached_offset(self, path):
+        """Offset of path from an earlier run, or None"""
+        if file_digest(path) == self._reference_digest:
+            return 0, 0
+        key = self._key(path)
+        with self._lock:
+            entry = self._cache.get(key)
+        return None if entry is None else (entry['dx'], entry['dy'])
+
+    def estimate(self, image, scale=1.0):
+        """(dx, dy, response) of a decoded frame; scale is the frame's scale relative to full resolution
+
+        The frame content moved by (dx, dy) full-resolution pixels relative to
+        the reference. response (0-1) is the correlation peak height - low
+        values mean the estimate is unreliable.
+        """
+        height, width = self._reference.shape
+        proxy = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+        if proxy.ndim == 3:
+            proxy = cv2.cvtColor(proxy, cv2.COLOR_BGR2GRAY)
+        (dx, dy), response = cv2.phaseCorrelate(self._reference, proxy.astype(np.float32), self._window)
+        #proxy pixels -> full-resolution pixels
+        factor = image.shape[1] / scale / width
+        return int(round(dx * factor)), int(round(dy * factor)), float(response)
+
+    def offset_for(self, image, path, scale=1.0):
+        """Estimate the offset of path from its decoded frame and cache it (see cached_offset)"""
+        if file_digest(path) == self._reference_digest:
+            return 0, 0
+        dx, dy, response = self.estimate(image, scale)
+        with self._lock:
+            self._cache.put(self._key(path), {'dx': dx, 'dy': dy, 'response': response})
+        return dx, dy
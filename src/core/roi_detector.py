@@ -0,0 +1,84 @@
+import cv2
+from src.core.hashing import file_digest
+from src.core.image_loader import ImageLoader
+from src.core.json_cache import JsonCache
+
+class ROIDetector:
+    """Find the two sunscreen squares and the control gap between them
+
+    Works on the downscaled grayscale preview: the squares are the darkest
+    large, square-ish blobs. The left square is the sunscreen ROI and the
+    strip between the squares is the control ROI. Both are shrunk by margin
+    so square edges never leak into the statistics.
+    """
+    def __init__(self, cache_file='outputs/cache/roi_detections.json', min_area_fraction=0.01,
+                 margin=0.1, min_fill=0.8):
+        self.cache_file = cache_file
+        self.min_area_fraction = min_area_fraction
+        self.margin = margin
+        self.min_fill = min_fill
+        self._cache = JsonCache(cache_file)
+    
+    def find_squares(self, preview):
+        """Bounding boxes (x, y, w, h) of the square blobs, largest first"""
+        blurred = cv2.GaussianBlur(preview, (5, 5), 0)
+        #squares are darker than the plate background
+        _, mask = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+        
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_area = self.min_area_fraction * preview.shape[0] * preview.shape[1]
+        squares = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w * h < min_area or not 0.5 <= w / h <= 2:
+                continue
+            #a filled square covers almost all of its bounding box
+            if cv2.contourArea(contour) < self.min_fill * w * h:
+                continue
+            squares.append((x, y, w, h))
+        return sorted(squares, key=lambda s: s[2] * s[3], reverse=True)
+    
+    def detect(self, preview, scale):
+        """Return (sunscreen_roi, control_roi) in full-resolution coordinates"""
+        squares = self.find_squares(preview)
+        if len(squares) < 2:
+            raise ValueError(f"Expected two sunscreen squares, found {len(squares)}")
+        left, right = sorted(squares[:2], key=lambda s: s[0])
+        
+        gap_x0 = left[0] + left[2]
+        gap_x1 = right[0]
+        gap_y0 = max(left[1], right[1])
+        gap_y1 = min(left[1] + left[3], right[1] + right[3])
+        if gap_x1 <= gap_x0 or gap_y1 <= gap_y0:
+            raise ValueError("Sunscreen squares overlap - no control gap between them")
+        gap = (gap_x0, gap_y0, gap_x1 - gap_x0, gap_y1 - gap_y0)
+        
+        sunscreen_roi = self._to_full_resolution(self._shrink(left), scale)
+        control_roi = self._to_full_resolution(self._shrink(gap), scale)
+        return sunscreen_roi, control_roi
+    
+    def detect_file(self, image_path, scale=0.3, image_loader=None):
+        """Detect ROIs for an image file, served from the cache when the content was seen before"""
+        key = f"{file_digest(image_path)}:{self.min_area_fraction}:{self.margin}:{self.min_fill}"
+        entry = self._cache.get(key)
+        if entry is not None:
+            return tuple(entry['sunscreen_roi']), tuple(entry['control_roi'])
+        
+        image_loader = image_loader or ImageLoader()
+        preview, preview_scale = image_loader.load_preview(image_path, scale)
+        sunscreen_roi, control_roi = self.detect(preview, preview_scale)
+        
+        self._cache.put(key, {'sunscreen_roi': list(sunscreen_roi), 'control_roi': list(control_roi)})
+        return sunscreen_roi, control_roi
+    
+    def _shrink(self, box):
+        x, y, w, h = box
+        dx = int(w * self.margin)
+        dy = int(h * self.margin)
+        return (x + dx, y + dy, w - 2 * dx, h - 2 * dy)
+    
+    def _to_full_resolution(self, box, scale):
+        return tuple(int(round(v / scale)) for v in box)
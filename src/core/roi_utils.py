@@ -0,0 +1,36 @@
+def union_roi(rois):
+    """Bounding box (x, y, w, h) covering every ROI"""
+    rois = [roi for roi in rois if roi is not None]
+    if not rois:
+        raise ValueError("No ROIs given")
+
+    x0 = min(x for x, y, w, h in rois)
+    y0 = min(y for x, y, w, h in rois)
+    x1 = max(x + w for x, y, w, h in rois)
+    y1 = max(y + h for x, y, w, h in rois)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def offset_roi(roi, origin):
+    """Express a full-frame ROI relative to a crop starting at origin (x, y)"""
+    x, y, w, h = roi
+    ox, oy = origin
+    return (x - ox, y - oy, w, h)
+
+
+def scale_roi(roi, factor):
+    """ROI in an image resized by factor (e.g. 1/4 for a 1/4-scale decode)"""
+    x, y, w, h = roi
+    x0, y0 = round(x * factor), round(y * factor)
+    return (x0, y0, round((x + w) * factor) - x0, round((y + h) * factor) - y0)
+
+
+def shift_rois(rois, offset):
+    """{name: roi} moved by offset (dx, dy), kept from running off the top/left edge"""
+    dx, dy = offset
+    return {name: (max(0, x + dx), max(0, y + dy), w, h) for name, (x, y, w, h) in rois.items()}
+
+
+def roi_names(timepoint_result):
+    """ROI names in one timepoint's results (entries that carry stats)"""
+    return [name for name, value in timepoint_result.items() if isinstance(value, dict) and 'stats' in value]
@@ -0,0 +1,104 @@
+"""Strip-wise analysis of scans too large to decode in one piece
+
+Whole-plate flatbed scans can be several gigapixels. Instead of decoding the
+frame, the image is opened as a memory-mapped array and the union of the ROIs
+is walked in strips of tile_rows rows. Each strip is converted to grayscale,
+flat-field corrected when asked, and counted into the per-ROI histograms, so memory is bounded by the strip
+size (tile_rows x union width) and never by the image size.
+
+Supported sources:
+    .npy               np.load(mmap_mode='r')
+    .tif / .tiff       uncompressed TIFFs through tifffile.memmap (optional dependency)
+    anything else      raw pixel buffers through open_raw(path, shape)
+"""
+import cv2
+import numpy as np
+from pathlib import Path
+from src.core.intensity_analyzer import roi_histogram
+from src.core.metrics import metrics
+from src.core.roi_utils import union_roi
+from src.data.statistics import N_BINS, statistics_from_histogram
+
+DEFAULT_TILE_ROWS = 512
+TILED_SUFFIXES = ('.npy', '.tif', '.tiff')
+
+def open_raw(path, shape, dtype=np.uint8, offset=0):
+    """Memory-map a headerless pixel buffer of the given (h, w) or (h, w, 3) shape"""
+    return np.memmap(path, dtype=dtype, mode='r', shape=tuple(shape), offset=offset)
+
+
+def open_large_image(path):
+    """Memory-mapped (h, w) or (h, w, channels) array of a .npy or uncompressed TIFF file"""
+    suffix = Path(path).suffix.lower()
+    if suffix == '.npy':
+        return np.load(path, mmap_mode='r')
+    if suffix in ('.tif', '.tiff'):
+        try:
+            import tifffile
+        except ImportError:
+            raise ImportError("Strip-wise TIFF reading needs tifffile: pip install tifffile")
+        try:
+            return tifffile.memmap(path, mode='r')
+        except ValueError:
+            raise ValueError(f"{path} is compressed or tiled - save it as an uncompressed TIFF or .npy "
+                             "for strip-wise reading")
+    raise ValueError(f"No memory-mapped reader for {path} - use open_raw(path, shape) for raw buffers")
+
+
+def tiled_histograms(image, rois, tile_rows=DEFAULT_TILE_ROWS, conversion=cv2.COLOR_BGR2GRAY, flat_field=None):
+    """{name: 256-bin histogram} accumulated strip by strip over the ROI union
+
+    image can be any array-like that slices lazily (np.memmap, mmap'ed .npy).
+    rois maps name -> (x, y, w, h) in image coordinates. conversion is the
+    cv2 code for colour strips - BGR for OpenCV-style buffers, RGB for TIFFs.
+    A FlatField corrects every strip before it is counted.
+    """
+    ux, uy, uw, uh = union_roi(rois.values())
+    histograms = {name: np.zeros(N_BINS, dtype=np.int64) for name in rois}
+
+    for top in range(uy, uy + uh, tile_rows):
+        bottom = min(top + tile_rows, uy + uh)
+        #only the pages of this strip are read from disk
+        with metrics.stage('read'):
+            strip = np.ascontiguousarray(image[top:bottom, ux:ux+uw])
+        with metrics.stage('grayscale'):
+            gray = cv2.cvtColor(strip, conversion) if strip.ndim == 3 else strip
+        if flat_field is not None:
+            with metrics.stage('illumination'):
+                gray = flat_field.apply(gray, (ux, top, uw, bottom - top))
+
+        for name, (x, y, w, h) in rois.items():
+            first, last = max(y, top), min(y + h, bottom)
+            if first >= last:
+                continue
+            with metrics.stage('histogram'):
+                histograms[name] += roi_histogram(gray[first-top:last-top, x-ux:x-ux+w])
+        metrics.count('bytes_read', strip.nbytes)
+    return histograms
+
+
+def analyze_large_image(path, rois, tile_rows=DEFAULT_TILE_ROWS, shape=None, flat_field=None):
+    """Per-ROI histogram and stats of a large scan, same layout as IntensityAnalyzer.analyze_rois
+
+    Raw buffers need their shape; .npy and TIFF files carry it themselves.
+    Results have no 'intensities', like results served from the cache.
+    """
+    if shape is not None:
+        image = open_raw(path, shape)
+    else:
+        image = open_large_image(path)
+    #tifffile returns RGB, OpenCV-style buffers are BGR
+    rgb = Path(path).suffix.lower() in ('.tif', '.tiff')
+    histograms = tiled_histograms(image, rois, tile_rows, cv2.COLOR_RGB2GRAY if rgb else cv2.COLOR_BGR2GRAY,
+                                  flat_field)
+
+    results = {}
+    for name, histogram in histograms.items():
+        with metrics.stage('stats'):
+            stats = statistics_from_histogram(histogram)
+        metrics.count('pixels_processed', stats['pixel_count'])
+        results[name] = {
+            'histogram': histogram,
+            'stats': stats
+        }
+    return results
@@ -0,0 +1,85 @@
+import csv
+import os
+import time
+from pathlib import Path
+from src.core.batch import IMAGE_SUFFIXES, TIMEPOINT_PATTERN, parse_timepoint
+from src.core.options import AnalysisOptions
+from src.core.pipeline import stream_analysis
+from src.data.exporter import DataExporter
+
+def processed_timepoints(csv_file):
+    """Timepoints already present in an exported CSV"""
+    if not Path(csv_file).exists():
+        return set()
+    with open(csv_file, newline='') as f:
+        rows = csv.reader(f)
+        next(rows, None)
+        return {DataExporter._parse_time(row[0]) for row in rows if row}
+
+
+class ImageWatcher:
+    """Analyze timepoint images as they land in a directory
+
+    Polls the directory every interval seconds. A file is only analyzed once
+    its size has stopped changing between two polls, so half-written camera
+    uploads are never decoded. Each new image is analyzed on its own and
+    appended to the CSV/JSON reports, so the cost per frame does not depend
+    on how long the series already is.
+    """
+    def __init__(self, directory, roi_selector, csv_file, json_file, cache=None, interval=2.0,
+                 pixel_format='none'):
+        self.directory = Path(directory)
+        self.roi_selector = roi_selector
+        self.csv_file = csv_file
+        self.json_file = json_file
+        self.cache = cache
+        self.interval = interval
+        self.pixel_format = pixel_format
+        #timepoints already in the reports are never analyzed again
+        self.done = processed_timepoints(csv_file)
+        self._sizes = {}
+
+    def pending(self):
+        """New images whose size was stable since the previous poll"""
+        ready = []
+        sizes = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                path = Path(entry.path)
+                if path.suffix.lower() not in IMAGE_SUFFIXES or not TIMEPOINT_PATTERN.search(path.stem):
+                    continue
+                if parse_timepoint(path) in self.done:
+                    continue
+                size = entry.stat().st_size
+                sizes[path] = size
+                if self._sizes.get(path) == size and size > 0:
+                    ready.append(path)
+        self._sizes = sizes
+        return sorted(ready, key=parse_timepoint)
+
+    def process(self, path):
+        """Analyze one new image and append it to the reports"""
+        timepoint = parse_timepoint(path)
+        options = AnalysisOptions(cache=self.cache, prefetch=0, keep_intensities=self.pixel_format != 'none')
+        timepoint, result = next(stream_analysis([path], [timepoint], self.roi_selector, options))
+        DataExporter.append_to_csv(timepoint, result, self.csv_file)
+        DataExporter.append_to_json(timepoint, result, self.json_file, self.pixel_format)
+        self.done.add(timepoint)
+        print(f"Analyzed: {path.name} ({timepoint} hours)")
+        return timepoint, result
+
+    def poll(self):
+        """One polling round; returns the timepoints analyzed"""
+        return [self.process(path)[0] for path in self.pending()]
+
+    def run(self, max_polls=None):
+        """Keep polling until interrupted (or for max_polls rounds)"""
+        print(f"Watching {self.directory} every {self.interval}s - Ctrl+C to stop")
+        polls = 0
+        try:
+            while max_polls is None or polls < max_polls:
+                self.poll()
+                polls += 1
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            print("Stopped watching")
@@ -0,0 +1,126 @@
+"""Bootstrap confidence intervals and p-values straight from 256-bin histograms
+
+Resampling an ROI's pixels with replacement is the same as drawing its
+histogram from a multinomial with the observed level frequencies, so every
+resample is one multinomial draw over the occupied levels instead of a pass
+over ~120k raw pixels. The mean and median of all resamples are then read
+off the drawn counts in a few array operations.
+
+The multinomial draws dominate: about 0.1 s per 10k resamples of a 120k-pixel
+ROI spread over ~80 levels, i.e. ~1 s per 4-timepoint sample on one core.
+Large resample counts are therefore split across a process pool by default.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.data.statistics import histogram_quantile
+
+DEFAULT_RESAMPLES = 10_000
+#from this many resamples on, the default is one worker process per CPU
+PARALLEL_RESAMPLES = 5_000
+#resamples drawn per block - bounds memory to CHUNK x occupied levels counts
+CHUNK = 2_500
+
+def bootstrap_statistics(hist, resamples=DEFAULT_RESAMPLES, seed=None):
+    """(means, medians) of resamples multinomial bootstrap draws of a histogram"""
+    hist = np.asarray(hist)
+    levels = np.flatnonzero(hist)
+    n = int(hist.sum())
+    probabilities = hist[levels] / n
+    rng = np.random.default_rng(seed)
+    #pixel count is fixed, so the median ranks are the same for every resample
+    position = (n - 1) * 0.5
+    lower, upper = int(np.floor(position)), int(np.ceil(position))
+
+    means = np.empty(resamples)
+    medians = np.empty(resamples)
+    for start in range(0, resamples, CHUNK):
+        stop = min(start + CHUNK, resamples)
+        counts = rng.multinomial(n, probabilities, size=stop - start)
+        cumulative = np.cumsum(counts, axis=1)
+        means[start:stop] = counts @ levels / n
+        low_values = levels[(cumulative <= lower).sum(axis=1)]
+        high_values = levels[(cumulative <= upper).sum(axis=1)]
+        medians[start:stop] = low_values + (high_values - low_values) * (position - lower)
+    return means, medians
+
+
+def _bootstrap_task(task):
+    hist, resamples, seed = task
+    return bootstrap_statistics(hist, resamples, seed)
+
+
+class BootstrapComparison:
+    """Target vs reference ROI differences with bootstrap CIs and p-values
+
+    compare() returns, for the mean and the median of target - reference,
+    the observed difference, a percentile confidence interval and a
+    two-sided p-value for "no difference" from the null-centred bootstrap
+    distribution. With workers > 1 the resamples are split across a process
+    pool that lives until close(); workers=None picks one per CPU for
+    PARALLEL_RESAMPLES or more resamples.
+
+        with BootstrapComparison(resamples=10000) as comparison:
+            result['comparison'] = comparison.compare(result)
+    """
+    def __init__(self, target='sunscreen', reference='control', resamples=DEFAULT_RESAMPLES, confidence=0.95,
+                 workers=None, seed=None):
+        self.target = target
+        self.reference = reference
+        self.resamples = resamples
+        self.confidence = confidence
+        if workers is None:
+            workers = os.cpu_count() if resamples >= PARALLEL_RESAMPLES else 1
+        self.workers = workers
+        self._seeds = np.random.SeedSequence(seed)
+        self._executor = None
+
+    def _draw(self, histograms):
+        """(means, medians) per histogram, split into per-worker blocks when a pool is used"""
+        if not self.workers or self.workers <= 1:
+            return [bootstrap_statistics(hist, self.resamples, seed)
+                    for hist, seed in zip(histograms, self._seeds.spawn(len(histograms)))]
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        sizes = [len(block) for block in np.array_split(np.arange(self.resamples), self.workers)]
+        tasks = [(hist, size, seed) for hist in histograms
+                 for size, seed in zip(sizes, self._seeds.spawn(len(sizes)))]
+        blocks = list(self._executor.map(_bootstrap_task, tasks))
+        return [tuple(np.concatenate(parts) for parts in zip(*blocks[i:i + len(sizes)]))
+                for i in range(0, len(blocks), len(sizes))]
+
+    def compare(self, result):
+        """Comparison entry for one timepoint's result"""
+        target_hist = result[self.target]['histogram']
+        reference_hist = result[self.reference]['histogram']
+        (target_means, target_medians), (reference_means, reference_medians) = self._draw(
+            [target_hist, reference_hist])
+
+        alpha = 1 - self.confidence
+        comparison = {'target': self.target, 'reference': self.reference, 'resamples': self.resamples,
+                      'confidence': self.confidence}
+        observed = {
+            'mean': result[self.target]['stats']['mean'] - result[self.reference]['stats']['mean'],
+            'median': (histogram_quantile(target_hist, 0.5) - histogram_quantile(reference_hist, 0.5)).item(),
+        }
+        draws = {'mean': target_means - reference_means, 'median': target_medians - reference_medians}
+        for name, differences in draws.items():
+            low, high = np.quantile(differences, [alpha / 2, 1 - alpha / 2])
+            #centre the draws on zero to get the null distribution of the difference
+            extreme = np.count_nonzero(np.abs(differences - differences.mean()) >= abs(observed[name]))
+            comparison[f'{name}_difference'] = float(observed[name])
+            comparison[f'{name}_ci_low'] = float(low)
+            comparison[f'{name}_ci_high'] = float(high)
+            comparison[f'{name}_p_value'] = float((extreme + 1) / (self.resamples + 1))
+        return comparison
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
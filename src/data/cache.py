@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import zipfile
+from pathlib import Path
+import numpy as np
+from src.core.hashing import file_digest
+from src.core.metrics import metrics
+from src.core.roi_utils import roi_names
+from src.data.statistics import statistics_from_histogram
+
+#bump whenever analysis output changes so stale entries stop matching
+ANALYSIS_VERSION = 1
+
+class ResultCache:
+    """On-disk cache of per-timepoint ROI histograms
+
+    Entries are keyed by the image (content hash, or path/size/mtime when
+    use_mtime is set), the ROIs, the analysis options and ANALYSIS_VERSION.
+    Only histograms are stored - stats are re-derived from them in O(256) on
+    a hit. Entries are .npz files; the least recently used are evicted once
+    the directory grows past max_bytes. The directory size is scanned once and
+    then kept as a running total, so a put() only rescans when eviction is due.
+    """
+    def __init__(self, cache_dir='outputs/cache/results', max_bytes=512 * 1024 * 1024, use_mtime=False):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.use_mtime = use_mtime
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    def key(self, image_path, rois, options=None):
+        """Cache key for analyzing image_path with the given {name: roi} ROIs and options"""
+        if self.use_mtime:
+            stat = os.stat(image_path)
+            image_id = f"{Path(image_path).resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+        else:
+            image_id = file_digest(image_path)
+
+        payload = json.dumps({
+            'image': image_id,
+            'rois': {name: list(roi) for name, roi in rois.items()},
+            'options': options or {},
+            'version': ANALYSIS_VERSION
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        """Cached result for key (histograms + stats, no pixels), or None - also for a broken entry"""
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                result = {name[len('hist_'):]: {'histogram': data[name], 'stats': statistics_from_histogram(data[name])}
+                          for name in data.files if name.startswith('hist_')}
+        except (OSError, ValueError, EOFError, KeyError, zipfile.BadZipFile):
+            self.misses += 1
+            metrics.count('cache_misses')
+            return None
+
+        #mark as recently used for LRU eviction - another process may have evicted it meanwhile
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        metrics.count('cache_hits')
+        return result
+
+    def put(self, key, result):
+        """Store the histograms of an analyze_timepoint result"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        arrays = {f"hist_{roi_type}": result[roi_type]['histogram'] for roi_type in roi_names(result)}
+        #write then rename so a concurrent reader never sees half a file
+        if self._size is None:
+            self._size = self._scan_size()
+        tmp_path = self.cache_dir / f"{key}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        path = self._path(key)
+        replaced = path.stat().st_size if path.exists() else 0
+        self._size += tmp_path.stat().st_size - replaced
+        os.replace(tmp_path, path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _scan_size(self):
+        total = 0
+        for path in self.cache_dir.glob('*.npz'):
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for path in self.cache_dir.glob('*.npz'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.npz"
@@ -1,49 +1,79 @@
 import json
 import csv
+import base64
 from datetime import datetime
+from pathlib import Path
 import numpy as np
+from src.core.metrics import metrics
+from src.core.roi_utils import roi_names
+from src.data.manifest import fingerprint, results_fingerprint
 
+CSV_HEADER = ["Timepoint (hours)", "ROI Type", "Min", "Max", "Mean",
+              "Median", "Std Dev", "Range", "Pixel Count"]
+COMPARISON_HEADER = ["Timepoint (hours)", "Target", "Reference", "Mean Difference", "Mean CI Low", "Mean CI High",
+                     "Mean p-value", "Median Difference", "Median CI Low", "Median CI High", "Median p-value",
+                     "Resamples"]
+
+#how raw ROI pixels are stored in the JSON report:
+#  'list'   - plain list of ints (largest and slowest, kept for old readers)
+#  'base64' - uint8 buffer encoded inline
+#  'npy'    - one .npy file per ROI next to the JSON, memory-mappable on reload
+#  'none'   - pixels left out, the 256-bin histogram is kept
+PIXEL_FORMATS = ('list', 'base64', 'npy', 'none')
 class DataExporter:
     @staticmethod
-    def save_to_csv(results, output_file='uv_analysis_results.csv'):
-        """Save results to CSV file"""
+    @metrics.timed('export')
+    def save_to_csv(results, output_file='uv_analysis_results.csv', manifest=None):
+        """Save results to CSV file
+
+        With a RunManifest the file is left alone when it was written from
+        the same results before.
+        """
+        if manifest is not None and manifest.skip(output_file, fingerprint('csv', results_fingerprint(results))):
+            return
         with open(output_file, 'w', newline='') as f:
             writer = csv.writer(f)
             # Header
-            writer.writerow(["Timepoint (hours)", "ROI Type", "Min", "Max", "Mean", 
-                            "Median", "Std Dev", "Range", "Pixel Count"])
+            writer.writerow(CSV_HEADER)
             
             # Data
             for time in sorted(results.keys()):
-                for roi_type in ['sunscreen', 'control']:
-                    stats = results[time][roi_type]['stats']
-                    intensities = results[time][roi_type]['intensities']
-                    
-                    writer.writerow([
-                        time, roi_type, f"{stats['min']:.2f}", f"{stats['max']:.2f}",
-                        f"{stats['mean']:.2f}", f"{stats['median']:.2f}", f"{stats['std']:.2f}",
-                        f"{stats['range']:.2f}", len(intensities)
-                    ])
+                writer.writerows(DataExporter._csv_rows(time, results[time]))
         
+        metrics.count('bytes_written', Path(output_file).stat().st_size)
         print(f"CSV results saved to: {output_file}")
     
     @staticmethod
-    def save_to_json(results, output_file='analysis_results.json'):
-        """Save results to JSON file with human-readable structure"""
+    def _csv_rows(time, data):
+        """CSV rows for one timepoint"""
+        rows = []
+        for roi_type in roi_names(data):
+            stats = data[roi_type]['stats']
+            
+            rows.append([
+                time, roi_type, f"{stats['min']:.2f}", f"{stats['max']:.2f}",
+                f"{stats['mean']:.2f}", f"{stats['median']:.2f}", f"{stats['std']:.2f}",
+                f"{stats['range']:.2f}", stats['pixel_count']
+            ])
+        return rows
+    
+    @staticmethod
+    @metrics.timed('export')
+    def save_to_json(results, output_file='analysis_results.json', pixel_format='list', indent=2, manifest=None):
+        """Save results to JSON file with human-readable structure
+
+        pixel_format picks how raw ROI pixels are stored (see PIXEL_FORMATS);
+        the stats block is always plain JSON. With a RunManifest the file is
+        left alone when it was written from the same results and format before.
+        """
+        output_fingerprint = fingerprint('json', pixel_format, indent, results_fingerprint(results))
+        if manifest is not None and manifest.skip(output_file, output_fingerprint):
+            return
         
         # Convert numpy data to JSON-serializable format
         json_results = {}
         for time, data in results.items():
-            json_results[time] = {
-                'sunscreen': {
-                    'intensities': DataExporter._convert_to_serializable(data['sunscreen']['intensities']),
-                    'stats': DataExporter._convert_stats_to_serializable(data['sunscreen']['stats'])
-                },
-                'control': {
-                    'intensities': DataExporter._convert_to_serializable(data['control']['intensities']),
-                    'stats': DataExporter._convert_stats_to_serializable(data['control']['stats'])
-                }
-            }
+            json_results[time] = DataExporter._timepoint_to_serializable(data, time, output_file, pixel_format)
         
         json_data = {
             'analysis_metadata': {
@@ -55,24 +85,283 @@ class DataExporter:
             'summary': {
                 'total_pixels_analyzed': {
                     str(time): {
-                        'sunscreen': len(results[time]['sunscreen']['intensities']),
-                        'control': len(results[time]['control']['intensities'])
+                        roi_type: int(results[time][roi_type]['stats']['pixel_count'])
+                        for roi_type in roi_names(results[time])
                     } for time in results.keys()
                 }
             }
         }
         
         with open(output_file, 'w') as f:
-            json.dump(json_data, f, indent=2)
+            json.dump(json_data, f, indent=indent)
         
+        metrics.count('bytes_written', Path(output_file).stat().st_size)
         print(f"JSON results saved to: {output_file}")
     
+    @staticmethod
+    @metrics.timed('export')
+    def save_comparison_to_csv(results, output_file='comparison.csv', manifest=None):
+        """Save the bootstrap comparison of every timepoint to CSV"""
+        if manifest is not None and manifest.skip(output_file, fingerprint('comparison', results_fingerprint(results))):
+            return
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COMPARISON_HEADER)
+            
+            for time in sorted(results.keys()):
+                comparison = results[time].get('comparison')
+                if comparison is None:
+                    continue
+                writer.writerow([time, comparison['target'], comparison['reference']]
+                                + [f"{comparison[f'{stat}_{key}']:.4f}" for stat in ('mean', 'median')
+                                   for key in ('difference', 'ci_low', 'ci_high', 'p_value')]
+                                + [comparison['resamples']])
+        
+        metrics.count('bytes_written', Path(output_file).stat().st_size)
+        print(f"Comparison saved to: {output_file}")
+    
+    @staticmethod
+    @metrics.timed('export')
+    def save_batch_to_csv(batch_results, output_file='batch_results.csv'):
+        """Save {sample: results} from a batch run to one combined CSV"""
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Sample"] + CSV_HEADER)
+            
+            for sample in sorted(batch_results.keys()):
+                results = batch_results[sample]
+                for time in sorted(results.keys()):
+                    for row in DataExporter._csv_rows(time, results[time]):
+                        writer.writerow([sample] + row)
+        
+        metrics.count('bytes_written', Path(output_file).stat().st_size)
+        print(f"Batch CSV results saved to: {output_file}")
+    
+    @staticmethod
+    @metrics.timed('export')
+    def save_batch_to_json(batch_results, output_file='batch_results.json', indent=2):
+        """Save {sample: results} from a batch run to one combined JSON (stats + histograms)"""
+        json_data = {
+            'analysis_metadata': {
+                'timestamp': datetime.now().isoformat(),
+                'samples': sorted(batch_results.keys()),
+                'total_samples': len(batch_results)
+            },
+            'samples': {
+                sample: {
+                    str(time): DataExporter._timepoint_to_serializable(data, pixel_format='none')
+                    for time, data in sorted(results.items())
+                } for sample, results in sorted(batch_results.items())
+            }
+        }
+        
+        with open(output_file, 'w') as f:
+            json.dump(json_data, f, indent=indent)
+        
+        metrics.count('bytes_written', Path(output_file).stat().st_size)
+        print(f"Batch JSON results saved to: {output_file}")
+    
+    @staticmethod
+    @metrics.timed('export')
+    def save_trends_to_csv(samples, trends, output_file='trends.csv'):
+        """Save analyze_series output for (samples, timepoints) as one row per sample and timepoint
+
+        Per-sample values (decay rates, protection factor) repeat on each of
+        the sample's rows.
+        """
+        names = trends['roi_names']
+        with open(output_file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Sample", "Timepoint (hours)"] + [f"{name.capitalize()} Mean" for name in names]
+                            + ["Ratio", "Wasserstein", "KS"]
+                            + [f"{name.capitalize()} Decay Rate (1/h)" for name in names]
+                            + ["Protection Factor"])
+            
+            for s, sample in enumerate(samples):
+                for t, time in enumerate(trends['times']):
+                    writer.writerow(
+                        [sample, DataExporter._parse_time(time)]
+                        + [f"{value:.2f}" for value in trends['mean'][s, t]]
+                        + [f"{trends[key][s, t]:.4f}" for key in ('ratio', 'wasserstein', 'ks')]
+                        + [f"{value:.5f}" for value in trends['decay_rate'][s]]
+                        + [f"{trends['protection_factor'][s]:.3f}"])
+        
+        metrics.count('bytes_written', Path(output_file).stat().st_size)
+        print(f"Trends saved to: {output_file}")
+    
+    @staticmethod
+    @metrics.timed('export')
+    def append_to_csv(time, data, output_file):
+        """Append one timepoint's rows to a CSV, writing the header if the file is new"""
+        new_file = not Path(output_file).exists() or Path(output_file).stat().st_size == 0
+        with open(output_file, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(CSV_HEADER)
+            writer.writerows(DataExporter._csv_rows(time, data))
+    
+    @staticmethod
+    @metrics.timed('export')
+    def append_to_json(time, data, output_file, pixel_format='none'):
+        """Append one timepoint to a JSON report without rewriting it
+
+        Streamed reports (StreamingExporter or earlier appends) only have their
+        closing tail overwritten, so the cost does not grow with the series.
+        A report from save_to_json is converted to the streamed layout once.
+        """
+        path = Path(output_file)
+        if not path.exists():
+            with StreamingExporter(json_file=output_file, pixel_format=pixel_format) as exporter:
+                exporter.write(time, data)
+            return
+        
+        tail = STREAMED_JSON_TAIL.encode()
+        with open(path, 'rb+') as f:
+            f.seek(0, 2)
+            size = f.tell()
+            f.seek(max(0, size - len(tail) - 1))
+            ending = f.read()
+            if ending.endswith(tail):
+                separator = '' if ending[:1] == b'{' else ','
+                entry = separator + _streamed_json_entry(time, data, output_file, pixel_format)
+                f.seek(size - len(tail))
+                f.write(entry.encode() + tail)
+                f.truncate()
+                return
+        
+        DataExporter._convert_to_streamed_json(path)
+        DataExporter.append_to_json(time, data, output_file, pixel_format)
+    
+    @staticmethod
+    def _convert_to_streamed_json(path):
+        """Rewrite a save_to_json report in the appendable streamed layout"""
+        with open(path) as f:
+            json_data = json.load(f)
+        entries = [f'\n    {json.dumps(time)}: {json.dumps(data)}' for time, data in json_data['results'].items()]
+        with open(path, 'w') as f:
+            f.write(STREAMED_JSON_HEAD.format(metadata=json.dumps(json_data.get('analysis_metadata', {}))))
+            f.write(','.join(entries) + STREAMED_JSON_TAIL)
+    
+    @staticmethod
+    def load_json(input_file, mmap=True):
+        """Load a report written by save_to_json or StreamingExporter
+
+        Pixels and histograms come back as numpy arrays whatever pixel_format
+        was used; 'npy' pixels are memory-mapped when mmap is True.
+        """
+        with open(input_file) as f:
+            json_data = json.load(f)
+        
+        base_dir = Path(input_file).parent
+        return {DataExporter._parse_time(time): DataExporter._timepoint_from_serializable(data, base_dir, mmap)
+                for time, data in json_data['results'].items()}
+    
+    @staticmethod
+    def load_batch_json(input_file):
+        """Load {sample: results} written by save_batch_to_json"""
+        with open(input_file) as f:
+            json_data = json.load(f)
+        
+        base_dir = Path(input_file).parent
+        return {
+            sample: {DataExporter._parse_time(time): DataExporter._timepoint_from_serializable(data, base_dir)
+                     for time, data in results.items()}
+            for sample, results in json_data['samples'].items()
+        }
+    
+    @staticmethod
+    def _timepoint_from_serializable(data, base_dir, mmap=True):
+        """Inverse of _timepoint_to_serializable"""
+        timepoint = {}
+        for roi_type, roi_data in data.items():
+            if 'stats' not in roi_data:
+                timepoint[roi_type] = roi_data
+                continue
+            timepoint[roi_type] = {'stats': roi_data['stats']}
+            if 'histogram' in roi_data:
+                timepoint[roi_type]['histogram'] = np.array(roi_data['histogram'], dtype=np.int64)
+            if 'errors' in roi_data:
+                timepoint[roi_type]['errors'] = roi_data['errors']
+            if 'intensities' in roi_data:
+                timepoint[roi_type]['intensities'] = DataExporter._pixels_from_serializable(
+                    roi_data['intensities'], base_dir, mmap)
+        return timepoint
+    
+    @staticmethod
+    def _parse_time(time):
+        """JSON keys are strings - turn '2' back into 2 and '1.5' into 1.5"""
+        value = float(time)
+        return int(value) if value.is_integer() else value
+    
+    @staticmethod
+    def _timepoint_to_serializable(data, time=None, output_file=None, pixel_format='list'):
+        """Convert one timepoint's results to JSON-serializable types"""
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f"Unknown pixel format: {pixel_format}")
+        
+        serializable = {}
+        #per-timepoint extras such as the alignment offset
+        for name, value in data.items():
+            if isinstance(value, dict) and 'stats' not in value:
+                serializable[name] = DataExporter._convert_stats_to_serializable(value)
+        for roi_type in roi_names(data):
+            roi_data = data[roi_type]
+            serializable[roi_type] = {
+                'stats': DataExporter._convert_stats_to_serializable(roi_data['stats'])
+            }
+            if 'histogram' in roi_data:
+                serializable[roi_type]['histogram'] = DataExporter._convert_to_serializable(roi_data['histogram'])
+            if 'errors' in roi_data:
+                serializable[roi_type]['errors'] = DataExporter._convert_stats_to_serializable(roi_data['errors'])
+            if pixel_format != 'none' and 'intensities' in roi_data:
+                serializable[roi_type]['intensities'] = DataExporter._pixels_to_serializable(
+                    roi_data['intensities'], pixel_format, output_file, f"{time}_{roi_type}")
+        return serializable
+    
+    @staticmethod
+    def _pixels_to_serializable(intensities, pixel_format, output_file, name):
+        """Store raw ROI pixels in the requested compact form"""
+        if pixel_format == 'list':
+            return DataExporter._convert_to_serializable(intensities)
+        
+        intensities = np.ascontiguousarray(intensities, dtype=np.uint8)
+        if pixel_format == 'base64':
+            return {
+                'encoding': 'base64',
+                'dtype': 'uint8',
+                'length': len(intensities),
+                'data': base64.b64encode(intensities.tobytes()).decode('ascii')
+            }
+        
+        #npy sidecar: <report>_pixels/<time>_<roi>.npy, stored relative to the JSON
+        output_file = Path(output_file)
+        pixel_dir = output_file.parent / f"{output_file.stem}_pixels"
+        pixel_dir.mkdir(parents=True, exist_ok=True)
+        np.save(pixel_dir / f"{name}.npy", intensities)
+        return {
+            'encoding': 'npy',
+            'dtype': 'uint8',
+            'length': len(intensities),
+            'path': f"{pixel_dir.name}/{name}.npy"
+        }
+    
+    @staticmethod
+    def _pixels_from_serializable(data, base_dir, mmap=True):
+        """Inverse of _pixels_to_serializable"""
+        if isinstance(data, list):
+            return np.array(data, dtype=np.uint8)
+        if data['encoding'] == 'base64':
+            return np.frombuffer(base64.b64decode(data['data']), dtype=np.uint8)
+        if data['encoding'] == 'npy':
+            return np.load(Path(base_dir) / data['path'], mmap_mode='r' if mmap else None)
+        raise ValueError(f"Unknown pixel encoding: {data['encoding']}")
+    
     @staticmethod
     def _convert_to_serializable(data):
         """Convert numpy arrays to Python lists with native types"""
         if hasattr(data, 'tolist'):
-            # Convert numpy array to list and ensure native Python types
-            return [int(x) for x in data.tolist()]
+            # tolist() already gives native Python ints/floats
+            return data.tolist()
         elif isinstance(data, (np.integer, np.floating)):
             # Convert numpy scalars to Python native types
             return data.item()
@@ -103,13 +392,97 @@ class DataExporter:
         
         for time in sorted(results.keys()):
             print(f"\n--- Timepoint: {time} hours ---")
+            if 'alignment' in results[time]:
+                alignment = results[time]['alignment']
+                print(f"  Aligned: shifted ({alignment['dx']}, {alignment['dy']}) px from the reference")
             
-            for roi_type in ['sunscreen', 'control']:
+            for roi_type in roi_names(results[time]):
                 stats = results[time][roi_type]['stats']
+                #approximate runs show their 95% bounds next to the estimates
+                errors = results[time][roi_type].get('errors', {})
+                bound = lambda name: f" ± {errors[name]:.2f}" if errors.get(name) is not None else ""
                 print(f"\n  {roi_type.upper()} ROI:")
                 print(f"    Min intensity:    {stats['min']:.2f}")
                 print(f"    Max intensity:    {stats['max']:.2f}")
-                print(f"    Mean intensity:   {stats['mean']:.2f}")
-                print(f"    Median intensity: {stats['median']:.2f}")
-                print(f"    Std Dev:          {stats['std']:.2f}")
+                print(f"    Mean intensity:   {stats['mean']:.2f}{bound('mean')}")
+                print(f"    Median intensity: {stats['median']:.2f}{bound('median')}")
+                print(f"    Std Dev:          {stats['std']:.2f}{bound('std')}")
                 print(f"    Range:            {stats['range']:.2f}")
+                if errors:
+                    print(f"    Approximate:      {errors['sample_fraction']:.1%} of the pixels")
+            
+            comparison = results[time].get('comparison')
+            if comparison is not None:
+                print(f"\n  {comparison['target'].upper()} - {comparison['reference'].upper()} "
+                      f"({comparison['confidence']:.0%} CI, {comparison['resamples']} resamples):")
+                for stat in ('mean', 'median'):
+                    print(f"    {stat.capitalize() + ' difference:':<20}{comparison[f'{stat}_difference']:.2f} "
+                          f"[{comparison[f'{stat}_ci_low']:.2f}, {comparison[f'{stat}_ci_high']:.2f}] "
+                          f"p = {comparison[f'{stat}_p_value']:.4f}")
+
+
+#streamed JSON reports keep 'results' last, so a new timepoint can be appended
+#by overwriting the fixed tail instead of rewriting the file
+STREAMED_JSON_HEAD = '{{\n  "analysis_metadata": {metadata},\n  "results": {{'
+STREAMED_JSON_TAIL = '\n  }\n}\n'
+
+def _streamed_json_entry(time, data, json_file, pixel_format):
+    entry = json.dumps(DataExporter._timepoint_to_serializable(data, time, json_file, pixel_format))
+    return f'\n    {json.dumps(str(time))}: {entry}'
+
+
+class StreamingExporter:
+    """Write CSV rows and JSON entries as each timepoint is analyzed
+
+    Nothing is buffered beyond the current timepoint, so memory stays flat no
+    matter how long the series is. The JSON file has the same 'results'
+    section as DataExporter.save_to_json; the per-run summary is left out
+    because the pixel counts are already in each ROI's stats.
+
+        with StreamingExporter('uv_data.csv', 'analysis_results.json') as exporter:
+            for time, result in stream:
+                exporter.write(time, result)
+    """
+    def __init__(self, csv_file=None, json_file=None, pixel_format='list'):
+        self.csv_file = csv_file
+        self.json_file = json_file
+        self.pixel_format = pixel_format
+        self.timepoints = []
+        self._csv = None
+        self._csv_writer = None
+        self._json = None
+    
+    def __enter__(self):
+        if self.csv_file is not None:
+            self._csv = open(self.csv_file, 'w', newline='')
+            self._csv_writer = csv.writer(self._csv)
+            self._csv_writer.writerow(CSV_HEADER)
+        if self.json_file is not None:
+            self._json = open(self.json_file, 'w')
+            self._json.write(STREAMED_JSON_HEAD.format(metadata=json.dumps(
+                {'timestamp': datetime.now().isoformat(), 'streamed': True})))
+        return self
+    
+    @metrics.timed('export')
+    def write(self, time, data):
+        """Append one timepoint to the open outputs"""
+        if self._csv_writer is not None:
+            self._csv_writer.writerows(DataExporter._csv_rows(time, data))
+            self._csv.flush()
+        if self._json is not None:
+            separator = ',' if self.timepoints else ''
+            self._json.write(separator + _streamed_json_entry(time, data, self.json_file, self.pixel_format))
+            self._json.flush()
+        self.timepoints.append(time)
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._csv is not None:
+            self._csv.close()
+            metrics.count('bytes_written', Path(self.csv_file).stat().st_size)
+            print(f"CSV results saved to: {self.csv_file}")
+        if self._json is not None:
+            self._json.write(STREAMED_JSON_TAIL)
+            self._json.close()
+            metrics.count('bytes_written', Path(self.json_file).stat().st_size)
+            print(f"JSON results saved to: {self.json_file}")
+        return False
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import platform
+import time
+from datetime import datetime
+from importlib import metadata
+from pathlib import Path
+import numpy as np
+from src.core.hashing import file_digest
+from src.core.metrics import metrics
+
+LIBRARIES = ('numpy', 'opencv-python', 'opencv-python-headless', 'matplotlib')
+
+def library_versions():
+    """Python and installed library versions, read without importing the libraries"""
+    versions = {'python': platform.python_version()}
+    for name in LIBRARIES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            pass
+    return versions
+
+
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def fingerprint(*parts):
+    """SHA-256 of JSON-able parts"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=_json_default).encode()).hexdigest()
+
+
+def results_fingerprint(results):
+    """SHA-256 of analysis results: per-ROI histograms (or stats) and per-timepoint extras
+
+    Raw pixels are left out - they follow from the same images and ROIs.
+    """
+    digest = hashlib.sha256()
+    for time in sorted(results):
+        digest.update(repr(time).encode())
+        for name, value in sorted(results[time].items()):
+            digest.update(name.encode())
+            if 'histogram' in value:
+                digest.update(np.ascontiguousarray(value['histogram'], dtype=np.int64).tobytes())
+                value = {key: item for key, item in value.items() if key not in ('histogram', 'stats', 'intensities')}
+            else:
+                value = {key: item for key, item in value.items() if key != 'intensities'}
+            digest.update(json.dumps(value, sort_keys=True, default=_json_default).encode())
+    return digest.hexdigest()
+
+
+def _file_state(path):
+    """(size, mtime_ns) of path, or (None, None) when it is missing"""
+    try:
+        stat = Path(path).stat()
+    except FileNotFoundError:
+        return None, None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class RunManifest:
+    """What produced each output: input hashes, ROIs, config, options, versions and timings
+
+    Every output gets its own entry with a fingerprint of everything it was
+    made from, the run context recorded with record_inputs()/record(), and
+    the file's size and mtime once the run is saved. skip() compares against
+    the entry left by an earlier run, so exporters and the plotter can leave
+    an output alone when its inputs are unchanged and the file is still the
+    one that run wrote (not appended to by `watch`, say). Entries of outputs a
+    run does not write are kept; force only disables skipping.
+
+        manifest = RunManifest('outputs/reports/manifest.json')
+        manifest.record_inputs(image_paths)
+        DataExporter.save_to_csv(results, 'uv_data.csv', manifest=manifest)
+        manifest.save()
+    """
+    def __init__(self, manifest_file='outputs/reports/manifest.json', force=False):
+        self.manifest_file = Path(manifest_file)
+        self.force = force
+        previous = {}
+        if self.manifest_file.exists():
+            with open(self.manifest_file) as f:
+                previous = json.load(f)
+        self.previous = previous.get('outputs', {})
+        self.outputs = dict(self.previous)
+        #shared by every output this run writes
+        self.context = {'created': datetime.now().isoformat(), 'versions': library_versions()}
+        self._written = set()
+        self._started = time.perf_counter()
+
+    def record_inputs(self, paths):
+        """Hash the input files; returns {path: sha256}"""
+        self.context['inputs'] = {str(path): file_digest(path) for path in paths}
+        return self.context['inputs']
+
+    def record(self, **entries):
+        """Store extra run context, e.g. rois=..., config=..., options=..."""
+        self.context.update(entries)
+
+    def skip(self, output_file, output_fingerprint):
+        """True when output_file is still current; otherwise it is recorded as written by this run"""
+        output_file = str(output_file)
+        previous = self.previous.get(output_file)
+        current = (not self.force and isinstance(previous, dict)
+                   and previous.get('fingerprint') == output_fingerprint
+                   and _file_state(output_file) == (previous.get('size'), previous.get('mtime_ns')))
+        if current:
+            print(f"Unchanged, skipped: {output_file}")
+        else:
+            self.outputs[output_file] = {'fingerprint': output_fingerprint}
+            self._written.add(output_file)
+        return current
+
+    def save(self):
+        timings = {'wall_seconds': time.perf_counter() - self._started}
+        if metrics.enabled:
+            timings['stages'] = metrics.report()['stages']
+        #outputs are finished by now - their state tells a later run whether they were touched since
+        for output_file in self._written:
+            size, mtime_ns = _file_state(output_file)
+            self.outputs[output_file].update(self.context, size=size, mtime_ns=mtime_ns, timings=timings)
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.manifest_file, 'w') as f:
+            json.dump({'outputs': self.outputs}, f, indent=2, default=_json_default)
+        print(f"Run manifest saved to: {self.manifest_file}")
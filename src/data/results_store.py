@@ -0,0 +1,115 @@
+import sqlite3
+import uuid
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+from src.core.roi_utils import roi_names
+from src.data.statistics import N_BINS, STAT_NAMES
+
+STAT_COLUMNS = STAT_NAMES
+KEY_COLUMNS = ('run_id', 'sample', 'timepoint', 'roi')
+#histogram counts are stored as little-endian uint32, 1 KB per row
+HISTOGRAM_DTYPE = np.dtype('<u4')
+
+class ResultsStore:
+    """Append-only archive of (run, sample, timepoint, ROI) rows across runs
+
+    Every row holds the ROI statistics plus its 256-bin histogram. Rows live in
+    SQLite with indexes on sample/timepoint and ROI, so cross-run queries only
+    touch the rows and columns they ask for as the archive grows.
+
+        store = ResultsStore('outputs/results.sqlite')
+        store.append(results, sample='plate_07')
+        table = store.query(['sample', 'timepoint', 'mean'], roi='sunscreen')
+    """
+    def __init__(self, db_file='outputs/results.sqlite'):
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        self.db_file = str(db_file)
+        self._connection = sqlite3.connect(self.db_file)
+        self._create_schema()
+
+    def _create_schema(self):
+        stat_columns = ', '.join(f'"{column}" REAL' for column in STAT_COLUMNS)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, timestamp TEXT)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS results (run_id TEXT, sample TEXT, timepoint REAL, roi TEXT, '
+                f'{stat_columns}, histogram BLOB)')
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS results_sample_time ON results (sample, timepoint)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS results_roi ON results (roi)')
+
+    def append(self, results, sample, run_id=None):
+        """Append every ROI of every timepoint in results; returns the run id"""
+        return self.append_batch({sample: results}, run_id)
+
+    def append_batch(self, batch_results, run_id=None):
+        """Append {sample: results} in one transaction; returns the run id"""
+        run_id = run_id or uuid.uuid4().hex
+        rows = []
+        for sample, results in batch_results.items():
+            for time, data in results.items():
+                for roi_type in roi_names(data):
+                    stats = data[roi_type]['stats']
+                    histogram = np.asarray(data[roi_type]['histogram'], dtype=HISTOGRAM_DTYPE)
+                    rows.append((run_id, sample, float(time), roi_type)
+                                + tuple(float(stats[column]) for column in STAT_COLUMNS)
+                                + (histogram.tobytes(),))
+
+        placeholders = ', '.join('?' * (len(KEY_COLUMNS) + len(STAT_COLUMNS) + 1))
+        with self._connection:
+            self._connection.execute('INSERT OR IGNORE INTO runs VALUES (?, ?)',
+                                     (run_id, datetime.now().isoformat()))
+            self._connection.executemany(f'INSERT INTO results VALUES ({placeholders})', rows)
+        print(f"Stored {len(rows)} rows in: {self.db_file}")
+        return run_id
+
+    def _where(self, sample=None, roi=None, run_id=None, time_range=None):
+        clauses, params = [], []
+        for column, value in (('sample', sample), ('roi', roi), ('run_id', run_id)):
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            clauses.append(f'{column} IN ({", ".join("?" * len(values))})')
+            params.extend(values)
+        if time_range is not None:
+            clauses.append('timepoint BETWEEN ? AND ?')
+            params.extend(time_range)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query(self, columns=('sample', 'timepoint', 'roi', 'mean'), sample=None, roi=None, run_id=None,
+              time_range=None):
+        """Selected columns as {column: numpy array}, filtered on sample/roi/run/time range
+
+        sample, roi and run_id take a single value or a list; time_range is
+        (first, last) in hours, inclusive.
+        """
+        unknown = set(columns) - set(KEY_COLUMNS) - set(STAT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {sorted(unknown)}")
+        where, params = self._where(sample, roi, run_id, time_range)
+        select = ', '.join(f'"{column}"' for column in columns)
+        rows = self._connection.execute(
+            f'SELECT {select} FROM results{where} ORDER BY sample, timepoint, roi', params).fetchall()
+
+        table = {}
+        for i, column in enumerate(columns):
+            values = [row[i] for row in rows]
+            table[column] = np.array(values, dtype=object if column in ('run_id', 'sample', 'roi') else float)
+        return table
+
+    def histograms(self, sample=None, roi=None, run_id=None, time_range=None):
+        """(keys, counts): key columns as arrays plus an (N, 256) histogram matrix"""
+        where, params = self._where(sample, roi, run_id, time_range)
+        rows = self._connection.execute(
+            f'SELECT run_id, sample, timepoint, roi, histogram FROM results{where} '
+            'ORDER BY sample, timepoint, roi', params).fetchall()
+
+        keys = {column: np.array([row[i] for row in rows], dtype=float if column == 'timepoint' else object)
+                for i, column in enumerate(KEY_COLUMNS)}
+        counts = np.frombuffer(b''.join(row[4] for row in rows), dtype=HISTOGRAM_DTYPE).reshape(-1, N_BINS)
+        return keys, counts
+
+    def close(self):
+        self._connection.close()
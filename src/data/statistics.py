@@ -1,14 +1,116 @@
 import numpy as np
 
-def calculate_statistics(intensities):
-    """Calculate statistics for intensity array"""
+#intensities are 8-bit, so every statistic can be read off a 256-bin histogram
+N_BINS = 256
+LEVELS = np.arange(N_BINS)
+PERCENTILES = (5, 25, 75, 95)
+#keys of every stats dict, in order
+STAT_NAMES = ('min', 'max', 'mean', 'median', 'std', 'range', 'pixel_count', 'mode') + tuple(
+    f'p{p:02d}' for p in PERCENTILES)
+
+def calculate_histogram(intensities):
+    """256-bin histogram of 8-bit intensities"""
+    return np.bincount(np.ravel(intensities), minlength=N_BINS)
+
+
+def _values_at_ranks(cumulative, ranks):
+    """Intensity found at each 0-based rank of the sorted pixels"""
+    return np.searchsorted(cumulative, np.asarray(ranks) + 1, side='left')
+
+
+def histogram_quantile(hist, q, cumulative=None):
+    """Quantile(s) q in [0, 1] with the same linear interpolation as np.percentile"""
+    if cumulative is None:
+        cumulative = np.cumsum(hist)
+    n = cumulative[-1]
+    position = np.asarray(q, dtype=float) * (n - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    low_values = _values_at_ranks(cumulative, lower)
+    high_values = _values_at_ranks(cumulative, upper)
+    return low_values + (high_values - low_values) * (position - lower)
+
+
+def statistics_from_histogram(hist):
+    """Calculate statistics from a 256-bin histogram in O(256)"""
+    hist = np.asarray(hist)
+    cumulative = np.cumsum(hist)
+    n = int(cumulative[-1])
+    if n == 0:
+        raise ValueError("Cannot calculate statistics of an empty ROI")
+
+    occupied = np.flatnonzero(hist)
+    minimum = occupied[0]
+    maximum = occupied[-1]
+    mean = np.dot(hist, LEVELS) / n
+    variance = np.dot(hist, (LEVELS - mean) ** 2) / n
+    quantiles = histogram_quantile(hist, [0.5] + [p / 100 for p in PERCENTILES], cumulative)
+
     stats = {
-        'min': np.min(intensities),
-        'max': np.max(intensities),
-        'mean': np.mean(intensities),
-        'median': np.median(intensities),
-        'std': np.std(intensities),
-        'range': np.max(intensities) - np.min(intensities),
-        'pixel_count': len(intensities)
+        'min': minimum,
+        'max': maximum,
+        'mean': mean,
+        'median': quantiles[0],
+        'std': np.sqrt(variance),
+        'range': maximum - minimum,
+        'pixel_count': n,
+        'mode': np.argmax(hist)
     }
+    for p, value in zip(PERCENTILES, quantiles[1:]):
+        stats[f'p{p:02d}'] = value
     return stats
+
+
+#95% two-sided normal quantile
+Z_95 = 1.96
+
+def sampling_errors(hist, stats, sample_fraction, averaged=False):
+    """Approximate 95% error bounds of stats computed from a sample of an ROI's pixels
+
+    Standard errors of the mean and std follow the usual normal theory; the
+    median and percentiles use sqrt(q(1-q)/n) / density, with the density
+    read off the histogram. A finite-population correction accounts for
+    having sampled sample_fraction of the ROI. averaged means each counted
+    value is a block average (reduced decode): its error is a fixed bias from
+    DC rounding and edge blending rather than sampling noise, so every bound,
+    the mean's included, is None.
+    """
+    hist = np.asarray(hist)
+    n = stats['pixel_count']
+    correction = np.sqrt(max(0.0, 1.0 - sample_fraction))
+    errors = {
+        'mean': Z_95 * stats['std'] / np.sqrt(n) * correction,
+        'std': Z_95 * stats['std'] / np.sqrt(2 * max(n - 1, 1)) * correction,
+    }
+    #pixel density around each quantile, averaged over 5 levels
+    density = np.convolve(hist, np.ones(5) / 5, mode='same') / n
+    for name, q in [('median', 0.5)] + [(f'p{p:02d}', p / 100) for p in PERCENTILES]:
+        level = int(round(stats[name]))
+        errors[name] = Z_95 * np.sqrt(q * (1 - q) / n) / max(density[level], 1 / n) * correction
+    if averaged:
+        errors = dict.fromkeys(errors)
+    errors['sample_fraction'] = sample_fraction
+    return errors
+
+
+def is_averaged(errors):
+    """True when error bounds (see sampling_errors) come from block-averaged pixels"""
+    return errors is not None and errors.get('std', 0) is None
+
+
+def averaged_statistics(stats, errors):
+    """stats as reported for a run with these error bounds
+
+    For block-averaged pixels (reduced decode) only the mean and the number of
+    full-resolution pixels it covers are meaningful; everything else is NaN.
+    """
+    if not is_averaged(errors):
+        return stats
+    reported = {name: (value if name == 'mean' else np.nan) for name, value in stats.items()}
+    reported['pixel_count'] = int(round(stats['pixel_count'] / errors['sample_fraction']))
+    return reported
+
+
+def calculate_statistics(intensities):
+    """Calculate statistics for intensity array"""
+    return statistics_from_histogram(calculate_histogram(intensities))
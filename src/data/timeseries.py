@@ -0,0 +1,115 @@
+"""Vectorised trends across timepoints
+
+Per-timepoint histograms are stacked into one (..., timepoints, ROIs, 256)
+array - a single series, or a whole batch with a leading samples axis - and
+every trend is computed on that array in one go: means, the
+sunscreen/control ratio, log-linear decay rates, protection factors and
+distribution distances (Wasserstein-1 and Kolmogorov-Smirnov, read off the
+histogram CDFs). Missing timepoints are all-zero histograms and come out as NaN.
+"""
+import numpy as np
+from src.core.roi_utils import roi_names as timepoint_roi_names
+from src.data.statistics import LEVELS, N_BINS
+
+def stack_results(results, roi_names=None, times=None):
+    """(times, roi_names, histograms) of one {time: results} dict, histograms (T, R, 256)"""
+    times = sorted(results) if times is None else list(times)
+    if roi_names is None:
+        roi_names = timepoint_roi_names(results[times[0]])
+    histograms = np.zeros((len(times), len(roi_names), N_BINS), dtype=np.int64)
+    for t, time in enumerate(times):
+        for r, name in enumerate(roi_names):
+            if time in results and name in results[time]:
+                histograms[t, r] = results[time][name]['histogram']
+    return np.asarray(times, dtype=float), list(roi_names), histograms
+
+
+def stack_batch(batch_results, roi_names=None):
+    """(samples, times, roi_names, histograms) of {sample: results}, histograms (S, T, R, 256)
+
+    Samples are aligned on the union of their timepoints.
+    """
+    samples = sorted(batch_results)
+    times = sorted({time for results in batch_results.values() for time in results})
+    if roi_names is None:
+        first = batch_results[samples[0]]
+        roi_names = timepoint_roi_names(first[min(first)])
+    histograms = np.stack([stack_results(batch_results[sample], roi_names, times)[2] for sample in samples])
+    return samples, np.asarray(times, dtype=float), list(roi_names), histograms
+
+
+def histogram_means(histograms):
+    """Mean intensity of every histogram along the last axis (NaN when empty)"""
+    totals = histograms.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (histograms @ LEVELS) / totals
+
+
+def histogram_cdfs(histograms):
+    """Normalised cumulative distributions along the last axis"""
+    totals = histograms.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.cumsum(histograms, axis=-1) / totals
+
+
+def wasserstein_distance(histograms_a, histograms_b):
+    """Earth mover's distance in intensity levels: sum of |CDF_a - CDF_b| over the bins"""
+    return np.abs(histogram_cdfs(histograms_a) - histogram_cdfs(histograms_b)).sum(axis=-1)
+
+
+def ks_distance(histograms_a, histograms_b):
+    """Kolmogorov-Smirnov statistic: largest gap between the two CDFs"""
+    return np.abs(histogram_cdfs(histograms_a) - histogram_cdfs(histograms_b)).max(axis=-1)
+
+
+def decay_rates(times, values):
+    """Per-hour rate k of a values ~ exp(-k t) fit along the timepoints axis
+
+    values is (..., T) and strictly positive; NaN timepoints are left out of
+    the fit. A positive k means the intensity is falling.
+    """
+    log_values = np.log(np.where(values > 0, values, np.nan))
+    valid = ~np.isnan(log_values)
+    counts = valid.sum(axis=-1)
+    t = np.where(valid, times, 0.0)
+    y = np.where(valid, log_values, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t_mean = t.sum(axis=-1, keepdims=True) / counts[..., None]
+        y_mean = y.sum(axis=-1, keepdims=True) / counts[..., None]
+        dt = np.where(valid, t - t_mean, 0.0)
+        slope = (dt * (y - y_mean)).sum(axis=-1) / (dt ** 2).sum(axis=-1)
+    return -slope
+
+
+def analyze_series(times, roi_names, histograms, target='sunscreen', reference='control'):
+    """Trend arrays for stacked histograms (..., T, R, 256)
+
+    Returns a dict of arrays:
+        mean                  (..., T, R)  mean intensity
+        ratio                 (..., T)     target / reference mean
+        decay_rate            (..., R)     per-hour log-linear decay of the mean
+        protection_factor     (...)        reference decay rate / target decay rate
+        wasserstein, ks       (..., T)     target vs reference distribution distance
+        drift                 (..., T, R)  Wasserstein distance to the first timepoint
+    """
+    times = np.asarray(times, dtype=float)
+    target_index, reference_index = roi_names.index(target), roi_names.index(reference)
+    target_hist = histograms[..., target_index, :]
+    reference_hist = histograms[..., reference_index, :]
+
+    means = histogram_means(histograms)
+    rates = decay_rates(times, np.moveaxis(means, -2, -1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = means[..., target_index] / means[..., reference_index]
+        protection = rates[..., reference_index] / rates[..., target_index]
+    return {
+        'times': times,
+        'roi_names': list(roi_names),
+        'mean': means,
+        'ratio': ratio,
+        'decay_rate': rates,
+        'protection_factor': protection,
+        'wasserstein': wasserstein_distance(target_hist, reference_hist),
+        'ks': ks_distance(target_hist, reference_hist),
+        'drift': wasserstein_distance(histograms, histograms[..., :1, :, :]),
+    }
@@ -1,22 +1,108 @@
 import cv2
+import json
+from pathlib import Path
+from src.core.roi_detector import ROIDetector
 
 class ROISelector:
     def __init__(self):
-        self.sunscreen_roi = None
-        self.control_roi = None
+        #name -> (x, y, w, h); sunscreen/control are the classic two-square layout
+        self.rois = {}
     
-    def select_roi(self, image, roi_name="ROI", scale=0.3):
-        """Manually select ROI from image"""
-        img = image.copy()
-        
+    @property
+    def sunscreen_roi(self):
+        return self.rois.get('sunscreen')
+    
+    @sunscreen_roi.setter
+    def sunscreen_roi(self, roi):
+        self._set_roi('sunscreen', roi)
+    
+    @property
+    def control_roi(self):
+        return self.rois.get('control')
+    
+    @control_roi.setter
+    def control_roi(self, roi):
+        self._set_roi('control', roi)
+    
+    def _set_roi(self, name, roi):
+        if roi is None:
+            self.rois.pop(name, None)
+        else:
+            self.rois[name] = tuple(roi)
+    
+    def has_rois(self):
+        """True once ROIs are known - both classic ROIs, or any named layout without them"""
+        if 'sunscreen' in self.rois or 'control' in self.rois:
+            return self.sunscreen_roi is not None and self.control_roi is not None
+        return bool(self.rois)
+    
+    def set_named_rois(self, rois):
+        """Replace the ROIs with a {name: (x, y, w, h)} mapping"""
+        self.rois = {name: tuple(roi) for name, roi in rois.items()}
+        return self.rois
+    
+    def load_from_config(self, config):
+        """Take ROIs from the roi_settings section of analysis_config.json, if set there"""
+        roi_settings = config.get('roi_settings', {})
+        if roi_settings.get('rois'):
+            self.set_named_rois(roi_settings['rois'])
+        elif roi_settings.get('sunscreen_roi') and roi_settings.get('control_roi'):
+            self.sunscreen_roi = roi_settings['sunscreen_roi']
+            self.control_roi = roi_settings['control_roi']
+        return self.has_rois()
+    
+    def load_rois(self, roi_file):
+        """Load ROIs saved by save_rois"""
+        with open(roi_file) as f:
+            data = json.load(f)
+        if 'rois' in data:
+            self.set_named_rois(data['rois'])
+        else:
+            self.set_named_rois({'sunscreen': data['sunscreen_roi'], 'control': data['control_roi']})
+        print(f"Loaded ROIs from: {roi_file}")
+        return self.rois
+    
+    def save_rois(self, roi_file):
+        """Save ROIs so the same plate layout never has to be selected twice"""
+        Path(roi_file).parent.mkdir(parents=True, exist_ok=True)
+        with open(roi_file, 'w') as f:
+            json.dump({'rois': {name: list(roi) for name, roi in self.rois.items()}}, f, indent=2)
+        print(f"ROIs saved to: {roi_file}")
+    
+    def load_saved_rois(self, config=None, roi_file=None):
+        """Headless ROI lookup: ROI file first, then the config; True if ROIs were found"""
+        if roi_file is not None and Path(roi_file).exists():
+            self.load_rois(roi_file)
+        elif config is not None:
+            self.load_from_config(config)
+        return self.has_rois()
+    
+    def detect_rois(self, image_path, detector=None, scale=0.3):
+        """Set both ROIs automatically from the sunscreen squares in image_path"""
+        detector = detector or ROIDetector()
+        sunscreen_roi, control_roi = detector.detect_file(image_path, scale)
+        self.set_named_rois({'sunscreen': sunscreen_roi, 'control': control_roi})
+        print(f"Detected Sunscreen ROI: {self.sunscreen_roi}")
+        print(f"Detected Control ROI: {self.control_roi}")
+        return self.sunscreen_roi, self.control_roi
+    
+    def select_roi(self, image, roi_name="ROI", scale=0.3, image_scale=1.0):
+        """Manually select ROI from image
+
+        image_scale is the scale image already has relative to the full frame,
+        e.g. a reduced preview from ImageLoader.load_preview. The returned ROI
+        is always in full-resolution coordinates.
+        """
+        # Resize for display first, so only the small image is converted
+        display_h, display_w = image.shape[:2]
+        resize = scale / image_scale
+        new_w = int(display_w * resize)
+        new_h = int(display_h * resize)
+        img_resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
+
         # Convert to grayscale for display
-        img_display = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Resize for display
-        display_h, display_w = img_display.shape
-        new_w = int(display_w * scale)
-        new_h = int(display_h * scale)
-        img_resized = cv2.resize(img_display, (new_w, new_h))
+        if len(img_resized.shape) == 3:
+            img_resized = cv2.cvtColor(img_resized, cv2.COLOR_BGR2GRAY)
         
         print(f"Select {roi_name} - press ENTER when done, 'c' to cancel")
         print(f"Image scaled to {int(scale*100)}% for display")
@@ -30,15 +116,25 @@ class ROISelector:
         
         return roi
     
-    def set_rois(self, reference_image):
-        """Set both sunscreen and control ROIs interactively"""
-        print("=== Selecting Sunscreen ROI (left square) ===")
-        self.sunscreen_roi = self.select_roi(reference_image, "Sunscreen ROI")
+    def set_rois(self, reference_image, image_scale=1.0, scale=0.3, roi_file=None,
+                 roi_names=('sunscreen', 'control')):
+        """Set ROIs interactively - sunscreen and control by default, or any list of names
+
+        When roi_file is given the selection is saved there for later runs.
+        """
+        descriptions = {'sunscreen': 'left square', 'control': 'between squares'}
+        self.rois = {}
+        for i, name in enumerate(roi_names):
+            label = f"{name.capitalize()} ROI"
+            header = f"=== Selecting {label} ({descriptions[name]}) ===" if name in descriptions else f"=== Selecting {label} ==="
+            print(("\n" if i else "") + header)
+            self.rois[name] = self.select_roi(reference_image, label, scale, image_scale)
         
-        print("\n=== Selecting Control ROI (between squares) ===")
-        self.control_roi = self.select_roi(reference_image, "Control ROI")
+        print()
+        for name, roi in self.rois.items():
+            print(f"{name.capitalize()} ROI: {roi}")
         
-        print(f"\nSunscreen ROI: {self.sunscreen_roi}")
-        print(f"Control ROI: {self.control_roi}")
+        if roi_file is not None:
+            self.save_rois(roi_file)
         
-        return self.sunscreen_roi, self.control_roi
+        return tuple(self.rois.values())
@@ -1,28 +1,72 @@
-import matplotlib.pyplot as plt
+import math
+from pathlib import Path
+import numpy as np
+from src.core.metrics import metrics
+from src.core.roi_utils import roi_names
+from src.data.manifest import fingerprint, results_fingerprint
+from src.data.statistics import N_BINS, calculate_histogram
+
+#classic two-square layout keeps its colours; other ROIs use the matplotlib cycle
+ROI_COLORS = {'sunscreen': 'green', 'control': 'red'}
+BIN_EDGES = np.arange(N_BINS + 1)
+PUBLICATION_DPI = 300
+PREVIEW_DPI = 72
 
 class Plotter:
     @staticmethod
-    def plot_intensity_distributions(results, save_path='intensity_distributions.png'):
-        """Plot histograms of intensity distributions"""
-        fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-        fig.suptitle('Intensity Distributions Across Timepoints', fontsize=16)
+    @metrics.timed('plot')
+    def plot_intensity_distributions(results, save_path='intensity_distributions.png', preview=False,
+                                     dpi=None, columns=2, manifest=None):
+        """Plot histograms of intensity distributions
+
+        Draws the precomputed 256-bin histograms, so plot time does not depend
+        on how many pixels the ROIs have. Any number of timepoints is laid out
+        on a grid with the given number of columns. preview renders a quick
+        low-DPI image; dpi overrides either default. With a RunManifest the
+        figure is not redrawn when the results and settings are unchanged.
+        """
+        if dpi is None:
+            dpi = PREVIEW_DPI if preview else PUBLICATION_DPI
+        output_fingerprint = fingerprint('plot', dpi, columns, results_fingerprint(results))
+        if manifest is not None and manifest.skip(save_path, output_fingerprint):
+            return
         
-        for idx, time in enumerate(sorted(results.keys())):
-            ax = axes[idx // 2, idx % 2]
-            
-            sunscreen_int = results[time]['sunscreen']['intensities']
-            control_int = results[time]['control']['intensities']
-            
-            ax.hist(sunscreen_int, bins=50, alpha=0.6, label='Sunscreen', color='green', edgecolor='black')
-            ax.hist(control_int, bins=50, alpha=0.6, label='Control', color='red', edgecolor='black')
-            
+        #pyplot is slow to import, so only pull it in when a figure is actually drawn
+        import matplotlib
+        #render straight to file - no GUI backend needed, also on headless servers
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        
+        times = sorted(results.keys())
+        columns = max(1, min(columns, len(times)))
+        rows = math.ceil(len(times) / columns)
+        fig, axes = plt.subplots(rows, columns, figsize=(7.5 * columns, 5 * rows), squeeze=False)
+        fig.suptitle('Intensity Distributions Across Timepoints', fontsize=16)
+
+        for idx, time in enumerate(times):
+            ax = axes[idx // columns, idx % columns]
+
+            for roi_type in roi_names(results[time]):
+                roi_data = results[time][roi_type]
+                histogram = roi_data.get('histogram')
+                if histogram is None:
+                    histogram = calculate_histogram(roi_data['intensities'])
+                ax.stairs(histogram, BIN_EDGES, fill=True, alpha=0.6, label=roi_type.capitalize(),
+                          color=ROI_COLORS.get(roi_type))
+
+            ax.set_xlim(0, N_BINS)
             ax.set_xlabel('Intensity (0-255)')
             ax.set_ylabel('Pixel Count')
             ax.set_title(f'Timepoint: {time} hours')
             ax.legend()
             ax.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
+
+        #blank out the unused cells of the last row
+        for idx in range(len(times), rows * columns):
+            axes[idx // columns, idx % columns].set_visible(False)
+
+        fig.tight_layout()
+        fig.savefig(save_path, dpi=dpi, bbox_inches='tight')
+        plt.close(fig)
+        metrics.count('bytes_written', Path(save_path).stat().st_size)
         print(f"Histograms saved to: {save_path}")
-        # Removed plt.show() to avoid the non-interactive warning
@@ -0,0 +1,43 @@
+import numpy as np
+from src.data.bootstrap import BootstrapComparison, bootstrap_statistics
+from src.data.statistics import calculate_histogram, statistics_from_histogram
+
+
+def _roi(pixels):
+    histogram = calculate_histogram(pixels)
+    return {'histogram': histogram, 'stats': statistics_from_histogram(histogram)}
+
+
+def test_bootstrap_statistics_centre_on_the_sample():
+    pixels = np.random.default_rng(0).normal(120, 15, 2000).clip(0, 255).astype(np.uint8)
+    means, medians = bootstrap_statistics(calculate_histogram(pixels), resamples=4000, seed=1)
+    assert abs(means.mean() - pixels.mean()) < 0.1
+    #standard error of the mean
+    assert abs(means.std() - pixels.std() / np.sqrt(pixels.size)) < 0.05
+    assert abs(np.median(medians) - np.median(pixels)) <= 1
+
+
+def test_p_values_are_uniform_under_the_null():
+    rng = np.random.default_rng(2)
+    comparison = BootstrapComparison(resamples=400, seed=3)
+    p_values = []
+    for _ in range(200):
+        #both ROIs drawn from the same distribution
+        sunscreen, control = rng.normal(100, 12, (2, 300)).clip(0, 255).astype(np.uint8)
+        result = comparison.compare({'sunscreen': _roi(sunscreen), 'control': _roi(control)})
+        p_values.append(result['mean_p_value'])
+    p_values = np.array(p_values)
+    #10 of 200 rejections at the 5% level expected - the bounds leave room for chance
+    assert 0.005 <= np.mean(p_values < 0.05) <= 0.12
+    assert 0.35 <= np.mean(p_values) <= 0.65
+
+
+def test_a_real_difference_is_significant():
+    rng = np.random.default_rng(4)
+    sunscreen = rng.normal(60, 10, 500).clip(0, 255).astype(np.uint8)
+    control = rng.normal(70, 10, 500).clip(0, 255).astype(np.uint8)
+    with BootstrapComparison(resamples=1000, seed=5) as comparison:
+        result = comparison.compare({'sunscreen': _roi(sunscreen), 'control': _roi(control)})
+    assert result['mean_ci_low'] < result['mean_difference'] < result['mean_ci_high'] < 0
+    assert result['mean_p_value'] < 0.01
+    assert result['median_p_value'] < 0.01
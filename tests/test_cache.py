@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import pytest
+from src.data.cache import ResultCache
+from src.data.statistics import statistics_from_histogram
+
+
+def _result(level):
+    histogram = np.zeros(256, dtype=np.int64)
+    histogram[level:level + 10] = 50
+    return {'sunscreen': {'histogram': histogram, 'stats': statistics_from_histogram(histogram)},
+            'control': {'histogram': histogram[::-1].copy(), 'stats': statistics_from_histogram(histogram[::-1])},
+            'alignment': {'dx': 0, 'dy': 0}}
+
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / '0hours.JPG'
+    path.write_bytes(b'not really a jpeg')
+    return path
+
+
+def test_put_then_get_round_trips_histograms(tmp_path, image):
+    cache = ResultCache(tmp_path / 'cache')
+    key = cache.key(image, {'sunscreen': (0, 0, 10, 10)})
+    assert cache.get(key) is None
+
+    cache.put(key, _result(40))
+    cached = cache.get(key)
+    assert sorted(cached) == ['control', 'sunscreen']
+    assert np.array_equal(cached['sunscreen']['histogram'], _result(40)['sunscreen']['histogram'])
+    assert cached['sunscreen']['stats']['mean'] == pytest.approx(44.5)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_follows_content_rois_and_options(tmp_path, image):
+    cache = ResultCache(tmp_path / 'cache')
+    rois = {'sunscreen': (0, 0, 10, 10)}
+    key = cache.key(image, rois)
+    assert cache.key(image, {'sunscreen': (0, 0, 10, 11)}) != key
+    assert cache.key(image, rois, {'grayscale': False}) != key
+    image.write_bytes(b'another image')
+    assert cache.key(image, rois) != key
+
+
+@pytest.mark.parametrize('content', [b'', b'garbage', None])
+def test_broken_entries_are_misses(tmp_path, image, content):
+    cache = ResultCache(tmp_path / 'cache')
+    key = cache.key(image, {'sunscreen': (0, 0, 10, 10)})
+    cache.put(key, _result(40))
+    path = cache.cache_dir / f"{key}.npz"
+    #None: a truncated zip
+    path.write_bytes(path.read_bytes()[:100] if content is None else content)
+    assert cache.get(key) is None
+    assert cache.misses == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path / 'cache')
+    cache.put('a' * 64, _result(10))
+    entry_size = (cache.cache_dir / f"{'a' * 64}.npz").stat().st_size
+    cache.max_bytes = 3 * entry_size
+
+    cache.put('b' * 64, _result(20))
+    cache.put('c' * 64, _result(30))
+    #'a' becomes the most recently used
+    os.utime(cache.cache_dir / f"{'b' * 64}.npz", ns=(1, 1))
+    os.utime(cache.cache_dir / f"{'c' * 64}.npz", ns=(2, 2))
+    cache.put('d' * 64, _result(40))
+
+    assert sorted(p.stem[0] for p in cache.cache_dir.glob('*.npz')) == ['a', 'c', 'd']
+    assert cache._size == sum(p.stat().st_size for p in cache.cache_dir.glob('*.npz'))
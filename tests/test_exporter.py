@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from src.data.exporter import PIXEL_FORMATS, DataExporter, StreamingExporter
+from src.data.statistics import calculate_histogram, statistics_from_histogram
+
+
+def _result(seed):
+    rng = np.random.default_rng(seed)
+    result = {}
+    for name, level in (('sunscreen', 60), ('control', 170)):
+        pixels = rng.normal(level, 8, 400).clip(0, 255).astype(np.uint8)
+        histogram = calculate_histogram(pixels)
+        result[name] = {'histogram': histogram, 'stats': statistics_from_histogram(histogram), 'intensities': pixels}
+    return result
+
+
+@pytest.mark.parametrize('pixel_format', PIXEL_FORMATS)
+def test_streamed_and_appended_json_round_trip(tmp_path, pixel_format):
+    json_file = tmp_path / 'analysis_results.json'
+    results = {0: _result(0), 2: _result(1), 4.5: _result(2)}
+
+    with StreamingExporter(json_file=json_file, pixel_format=pixel_format) as exporter:
+        exporter.write(0, results[0])
+        exporter.write(2, results[2])
+    DataExporter.append_to_json(4.5, results[4.5], json_file, pixel_format)
+
+    loaded = DataExporter.load_json(json_file)
+    assert sorted(loaded) == [0, 2, 4.5]
+    for time, result in results.items():
+        for name, roi_data in result.items():
+            assert np.array_equal(loaded[time][name]['histogram'], roi_data['histogram'])
+            assert loaded[time][name]['stats']['mean'] == pytest.approx(roi_data['stats']['mean'])
+            if pixel_format == 'none':
+                assert 'intensities' not in loaded[time][name]
+            else:
+                assert np.array_equal(loaded[time][name]['intensities'], roi_data['intensities'])
@@ -0,0 +1,62 @@
+import json
+import os
+from src.data.manifest import RunManifest, fingerprint
+
+
+def _run(tmp_path, output, fp, force=False, **context):
+    manifest = RunManifest(tmp_path / 'manifest.json', force=force)
+    manifest.record(**context)
+    skipped = manifest.skip(output, fp)
+    if not skipped:
+        output.write_text(f"written for {fp}\n")
+    manifest.save()
+    return skipped
+
+
+def test_unchanged_output_is_skipped(tmp_path):
+    output = tmp_path / 'uv_data.csv'
+    assert not _run(tmp_path, output, fingerprint('csv', 1))
+    assert _run(tmp_path, output, fingerprint('csv', 1))
+    assert not _run(tmp_path, output, fingerprint('csv', 2))
+
+
+def test_output_changed_since_is_rewritten(tmp_path):
+    output = tmp_path / 'uv_data.csv'
+    _run(tmp_path, output, 'fp')
+    #e.g. the watch command appending rows
+    with open(output, 'a') as f:
+        f.write("more rows\n")
+    assert not _run(tmp_path, output, 'fp')
+
+    stat = output.stat()
+    os.utime(output, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not _run(tmp_path, output, 'fp')
+
+
+def test_missing_output_is_rewritten(tmp_path):
+    output = tmp_path / 'uv_data.csv'
+    _run(tmp_path, output, 'fp')
+    output.unlink()
+    assert not _run(tmp_path, output, 'fp')
+
+
+def test_each_output_keeps_the_context_that_produced_it(tmp_path):
+    exact, preview = tmp_path / 'uv_data.csv', tmp_path / 'preview_uv_data.csv'
+    _run(tmp_path, exact, 'exact', options={'reduce': 1})
+    _run(tmp_path, preview, 'preview', options={'reduce': 4})
+
+    outputs = json.loads((tmp_path / 'manifest.json').read_text())['outputs']
+    assert outputs[str(exact)]['options'] == {'reduce': 1}
+    assert outputs[str(preview)]['options'] == {'reduce': 4}
+    assert outputs[str(exact)]['size'] == exact.stat().st_size
+
+
+def test_force_rewrites_but_keeps_other_entries(tmp_path):
+    csv_file, json_file = tmp_path / 'uv_data.csv', tmp_path / 'analysis_results.json'
+    _run(tmp_path, csv_file, 'csv')
+    _run(tmp_path, json_file, 'json')
+    assert not _run(tmp_path, csv_file, 'csv', force=True)
+
+    outputs = json.loads((tmp_path / 'manifest.json').read_text())['outputs']
+    assert sorted(outputs) == sorted([str(csv_file), str(json_file)])
+    assert _run(tmp_path, json_file, 'json')
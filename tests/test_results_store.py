@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from src.data.results_store import ResultsStore
+from src.data.statistics import calculate_histogram, statistics_from_histogram
+
+
+def _results(mean, times=(0.0, 2.0)):
+    rng = np.random.default_rng(int(mean))
+    results = {}
+    for t in times:
+        results[t] = {}
+        for name, offset in (('sunscreen', 0), ('control', 20)):
+            histogram = calculate_histogram(rng.normal(mean + offset - t, 5, 400).clip(0, 255).astype(np.uint8))
+            results[t][name] = {'histogram': histogram, 'stats': statistics_from_histogram(histogram)}
+        results[t]['alignment'] = {'dx': 0, 'dy': 0}
+    return results
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(tmp_path / 'results.sqlite')
+    yield store
+    store.close()
+
+
+def test_append_then_query_round_trips(store):
+    results = _results(100)
+    run_id = store.append(results, sample='plate_01')
+
+    table = store.query(['run_id', 'sample', 'timepoint', 'roi', 'mean', 'pixel_count'])
+    assert len(table['roi']) == 4
+    assert set(table['run_id']) == {run_id} and set(table['sample']) == {'plate_01'}
+    for time, roi, mean, count in zip(table['timepoint'], table['roi'], table['mean'], table['pixel_count']):
+        assert mean == pytest.approx(results[time][roi]['stats']['mean'])
+        assert count == 400
+
+    keys, counts = store.histograms(roi='sunscreen')
+    assert keys['timepoint'].tolist() == [0.0, 2.0]
+    for time, histogram in zip(keys['timepoint'], counts):
+        assert np.array_equal(histogram, results[time]['sunscreen']['histogram'])
+
+
+def test_filters_across_runs(store):
+    first = store.append_batch({'plate_01': _results(100), 'plate_02': _results(150)})
+    second = store.append(_results(120, times=(0.0, 2.0, 4.0)), sample='plate_01')
+    assert first != second
+
+    assert len(store.query(sample='plate_01')['mean']) == 10
+    assert len(store.query(sample=['plate_01', 'plate_02'], roi='control')['mean']) == 7
+    assert len(store.query(run_id=second, time_range=(1, 4))['mean']) == 4
+    with pytest.raises(ValueError):
+        store.query(['not_a_column'])
@@ -0,0 +1,22 @@
+import pytest
+from src.core.roi_utils import scale_roi, shift_rois
+
+
+def test_shift_rois_round_trip():
+    rois = {'sunscreen': (120, 80, 300, 200), 'control': (500, 90, 60, 180)}
+    moved = shift_rois(rois, (-25, 40))
+    assert moved['sunscreen'] == (95, 120, 300, 200)
+    assert shift_rois(moved, (25, -40)) == rois
+
+
+def test_shift_rois_clamps_at_the_top_left_edge():
+    assert shift_rois({'roi': (10, 5, 50, 50)}, (-30, -30)) == {'roi': (0, 0, 50, 50)}
+
+
+@pytest.mark.parametrize('factor', [2, 4, 8])
+def test_scale_roi_round_trip(factor):
+    roi = (1203, 517, 861, 433)
+    back = scale_roi(scale_roi(roi, 1 / factor), factor)
+    #rounding to the reduced grid moves every edge by at most half a reduced pixel
+    assert all(abs(a - b) <= factor for a, b in zip(back, roi))
+    assert scale_roi(roi, 1) == roi
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from src.data.statistics import PERCENTILES, calculate_histogram, statistics_from_histogram
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_statistics_match_numpy(seed):
+    rng = np.random.default_rng(seed)
+    size = int(rng.integers(1, 5000))
+    pixels = rng.normal(rng.uniform(20, 230), rng.uniform(1, 40), size).clip(0, 255).astype(np.uint8)
+
+    stats = statistics_from_histogram(calculate_histogram(pixels))
+
+    assert stats['min'] == pixels.min()
+    assert stats['max'] == pixels.max()
+    assert stats['range'] == int(pixels.max()) - int(pixels.min())
+    assert stats['pixel_count'] == size
+    assert stats['mean'] == pytest.approx(pixels.mean())
+    assert stats['std'] == pytest.approx(pixels.std())
+    assert stats['median'] == np.median(pixels)
+    for p in PERCENTILES:
+        assert stats[f'p{p:02d}'] == pytest.approx(np.percentile(pixels, p))
+
+
+def test_empty_histogram_is_rejected():
+    with pytest.raises(ValueError):
+        statistics_from_histogram(np.zeros(256, dtype=np.int64))
@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+import pytest
+from src.core.illumination import FlatField
+from src.core.intensity_analyzer import IntensityAnalyzer
+from src.core.tiled import analyze_large_image, tiled_histograms
+
+ROIS = {'sunscreen': (13, 21, 40, 37), 'control': (70, 5, 25, 90)}
+
+
+def _plate(seed=0):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 256, (100, 120, 3), dtype=np.uint8)
+    #a lighting gradient for the flat field to take out
+    return (image * np.linspace(0.6, 1.0, 120)[None, :, None]).astype(np.uint8)
+
+
+@pytest.mark.parametrize('tile_rows', [1, 7, 512])
+def test_tiled_matches_decoded(tmp_path, tile_rows):
+    image = _plate()
+    np.save(tmp_path / 'plate.npy', image)
+
+    decoded = IntensityAnalyzer(None, {'keep_intensities': False}).analyze_rois(image, ROIS)
+    tiled = analyze_large_image(tmp_path / 'plate.npy', ROIS, tile_rows)
+
+    for name in ROIS:
+        assert np.array_equal(tiled[name]['histogram'], decoded[name]['histogram'])
+        assert tiled[name]['stats'] == decoded[name]['stats']
+
+
+def test_tiled_flat_field_matches_decoded(tmp_path):
+    image = _plate()
+    blank = (np.full((100, 120), 200.0) * np.linspace(0.6, 1.0, 120)).astype(np.uint8)
+    cv2.imwrite(str(tmp_path / 'blank.png'), blank)
+    #at full resolution every crop of the gain map is exact, so both paths see the same gain
+    flat_field = FlatField(tmp_path / 'blank.png', reduction=1, cache_dir=tmp_path / 'flatfield')
+
+    decoded = IntensityAnalyzer(None, {'keep_intensities': False, 'flat_field': flat_field}).analyze_rois(image, ROIS)
+    tiled = tiled_histograms(image, ROIS, tile_rows=16, flat_field=flat_field)
+
+    for name in ROIS:
+        assert np.array_equal(tiled[name], decoded[name]['histogram'])
+    plain = tiled_histograms(image, ROIS, tile_rows=16)
+    assert not np.array_equal(tiled['sunscreen'], plain['sunscreen'])
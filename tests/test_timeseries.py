@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from src.data.statistics import calculate_histogram, statistics_from_histogram
+from src.data.timeseries import analyze_series, ks_distance, stack_batch, stack_results, wasserstein_distance
+
+
+def _roi(pixels):
+    histogram = calculate_histogram(pixels)
+    return {'histogram': histogram, 'stats': statistics_from_histogram(histogram)}
+
+
+def _pixels(rng, mean, size=1000):
+    return rng.normal(mean, 10, size).clip(0, 255).astype(np.uint8)
+
+
+def test_distances_match_brute_force():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        a, b = _pixels(rng, rng.uniform(50, 200)), _pixels(rng, rng.uniform(50, 200))
+        hist_a, hist_b = calculate_histogram(a), calculate_histogram(b)
+        #equal sample sizes: W1 is the mean gap between the sorted samples
+        expected = np.abs(np.sort(a).astype(float) - np.sort(b)).mean()
+        assert wasserstein_distance(hist_a, hist_b) == pytest.approx(expected)
+        levels = np.arange(256)
+        cdf_a = (a[:, None] <= levels).mean(axis=0)
+        cdf_b = (b[:, None] <= levels).mean(axis=0)
+        assert ks_distance(hist_a, hist_b) == pytest.approx(np.abs(cdf_a - cdf_b).max())
+
+
+def test_series_means_ratio_and_decay():
+    rng = np.random.default_rng(1)
+    times = [0.0, 2.0, 4.0, 6.0]
+    #exponential decay, 0.05/h for the sunscreen and 0.1/h for the control
+    pixels = {t: {'sunscreen': np.full(500, round(200 * np.exp(-0.05 * t)), np.uint8),
+                  'control': _pixels(rng, 200 * np.exp(-0.1 * t))} for t in times}
+    results = {t: {name: _roi(p) for name, p in rois.items()} for t, rois in pixels.items()}
+
+    trends = analyze_series(*stack_results(results))
+
+    assert trends['roi_names'] == ['sunscreen', 'control']
+    for t, time in enumerate(times):
+        assert trends['mean'][t, 0] == pytest.approx(pixels[time]['sunscreen'].mean())
+        assert trends['mean'][t, 1] == pytest.approx(pixels[time]['control'].mean())
+        assert trends['ratio'][t] == pytest.approx(trends['mean'][t, 0] / trends['mean'][t, 1])
+    assert trends['decay_rate'][0] == pytest.approx(0.05, abs=0.005)
+    assert trends['decay_rate'][1] == pytest.approx(0.1, abs=0.01)
+    assert trends['protection_factor'] == pytest.approx(trends['decay_rate'][1] / trends['decay_rate'][0])
+    assert trends['drift'][0].tolist() == [0, 0]
+
+
+def test_batch_with_missing_timepoint_is_nan():
+    rng = np.random.default_rng(2)
+    roi = lambda mean: _roi(_pixels(rng, mean))
+    batch = {'a': {0.0: {'sunscreen': roi(150), 'control': roi(160)},
+                   2.0: {'sunscreen': roi(140), 'control': roi(150)}},
+             'b': {0.0: {'sunscreen': roi(150), 'control': roi(160)}}}
+
+    samples, times, names, histograms = stack_batch(batch)
+    assert samples == ['a', 'b'] and times.tolist() == [0.0, 2.0]
+    assert histograms.shape == (2, 2, 2, 256)
+
+    trends = analyze_series(times, names, histograms)
+    assert np.isnan(trends['mean'][1, 1]).all()
+    assert not np.isnan(trends['mean'][0]).any()
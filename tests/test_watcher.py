@@ -0,0 +1,59 @@
+import csv
+import cv2
+import numpy as np
+from src.core.watcher import ImageWatcher
+from src.data.exporter import DataExporter
+from src.ui.roi_selector import ROISelector
+
+ROIS = {'sunscreen': (10, 10, 30, 30), 'control': (60, 10, 30, 30)}
+
+
+def _write_image(path, level):
+    image = np.full((50, 100, 3), 200, dtype=np.uint8)
+    image[10:40, 10:40] = level
+    cv2.imwrite(str(path), image)
+
+
+def _watcher(tmp_path):
+    roi_selector = ROISelector()
+    roi_selector.set_named_rois(ROIS)
+    return ImageWatcher(tmp_path / 'images', roi_selector, tmp_path / 'uv_data.csv',
+                        tmp_path / 'analysis_results.json', interval=0)
+
+
+def test_new_images_are_appended_once(tmp_path):
+    (tmp_path / 'images').mkdir()
+    _write_image(tmp_path / 'images' / '0hours.png', 50)
+    (tmp_path / 'images' / 'notes.txt').write_text('not an image')
+    watcher = _watcher(tmp_path)
+
+    #the first poll only records the file size
+    assert watcher.poll() == []
+    assert watcher.poll() == [0.0]
+
+    _write_image(tmp_path / 'images' / '2hours.png', 80)
+    watcher.poll()
+    assert watcher.poll() == [2.0]
+    assert watcher.poll() == []
+
+    with open(tmp_path / 'uv_data.csv', newline='') as f:
+        rows = list(csv.reader(f))
+    assert len(rows) == 1 + 4
+    results = DataExporter.load_json(tmp_path / 'analysis_results.json')
+    assert sorted(results) == [0.0, 2.0]
+    assert results[0.0]['sunscreen']['stats']['mean'] == 50
+    assert results[2.0]['sunscreen']['stats']['mean'] == 80
+    assert results[2.0]['control']['stats']['mean'] == 200
+
+
+def test_restart_skips_timepoints_already_in_the_reports(tmp_path):
+    (tmp_path / 'images').mkdir()
+    _write_image(tmp_path / 'images' / '0hours.png', 50)
+    watcher = _watcher(tmp_path)
+    watcher.poll()
+    watcher.poll()
+
+    restarted = _watcher(tmp_path)
+    assert restarted.done == {0.0}
+    restarted.poll()
+    assert restarted.poll() == []